@@ -0,0 +1,90 @@
+import statistics
+import time
+from dataclasses import replace
+
+import sys
+
+import mss
+import numpy as np
+
+from capture import ReplayBackend, create_backend
+from config import Settings
+from utils import ark_window
+
+"""
+Measure per-frame capture latency of the Arknights window.
+
+Compares the old path (a new mss instance per frame) against the persistent
+capture session owned by ArknightsWindow, and each capture backend on the same
+machine. Run with the game window open, or pass a replay directory/.npz to
+benchmark the replay backend offline: python bench_capture.py <replay_path>
+"""
+FRAMES = 60
+
+
+def _report(label: str, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(f"{label:<28} median={statistics.median(samples_ms):7.2f}ms  "
+          f"mean={statistics.mean(samples_ms):7.2f}ms  p95={p95:7.2f}ms")
+
+
+def bench_new_instance_per_frame(frames: int = FRAMES):
+    samples = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        with mss.mss() as sct:
+            mon = sct.monitors[0]
+            np.array(sct.grab(mon))[:, :, :3][:, :, ::-1]
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def bench_window(frames: int = FRAMES):
+    samples = []
+    ark_window.make_screenshot()  # warm up: opens the capture session
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        ark_window.make_screenshot()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def bench_capture_mode(mode: str, frames: int = FRAMES):
+    previous = Settings.capture
+    Settings.capture = replace(previous, mode=mode)
+    try:
+        return bench_window(frames)
+    finally:
+        Settings.capture = previous
+
+
+def bench_backend(backend, frames: int = FRAMES):
+    previous = ark_window.backend
+    ark_window.set_backend(backend)
+    try:
+        return bench_capture_mode('window', frames)
+    finally:
+        ark_window.set_backend(previous)
+
+
+def main():
+    if len(sys.argv) > 1:
+        _report("replay backend", bench_backend(ReplayBackend(sys.argv[1])))
+        return
+    if not ark_window.window:
+        print("Arknights window not found; open the emulator first.")
+        return
+    print(f"Window: {ark_window.title} ({ark_window.width}x{ark_window.height}), {FRAMES} frames each")
+    _report("mss instance per frame", bench_new_instance_per_frame())
+    _report("session, full-screen crop", bench_capture_mode('full'))
+    _report("session, window rect", bench_capture_mode('window'))
+    if sys.platform.startswith('linux'):
+        try:
+            _report("xshm backend, window rect", bench_backend(create_backend('xshm')))
+        except Exception as ex:
+            print(f"xshm backend unavailable: {ex}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import statistics
+import sys
+import time
+
+from inputs import RecordingBackend, create_input_backend
+
+"""
+Measure the time spent inside a single click call for each input backend.
+
+Real backends click, so pass a harmless absolute screen position (e.g. an empty
+part of the desktop): python bench_input.py <x> <y> [backend ...]
+Without coordinates only the recording backend is measured.
+"""
+CLICKS = 50
+
+
+def _report(label: str, samples_ms):
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(f"{label:<12} median={statistics.median(samples_ms):7.3f}ms  "
+          f"mean={statistics.mean(samples_ms):7.3f}ms  p95={p95:7.3f}ms")
+
+
+def bench_backend(backend, x: int, y: int, clicks: int = CLICKS):
+    samples = []
+    backend.click(x, y)  # warm up: opens connections / loads libraries
+    for _ in range(clicks):
+        t0 = time.perf_counter()
+        backend.click(x, y)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    backend.close()
+    return samples
+
+
+def main():
+    _report("recording", bench_backend(RecordingBackend(), 0, 0))
+    if len(sys.argv) < 3:
+        return
+    x, y = int(sys.argv[1]), int(sys.argv[2])
+    for name in sys.argv[3:] or ['pyautogui', 'xtest']:
+        try:
+            backend = create_input_backend(name)
+        except Exception as ex:
+            print(f"{name} backend unavailable: {ex}")
+            continue
+        _report(name, bench_backend(backend, x, y))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+import ctypes
+import ctypes.util
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from logger import logger
+from config import Settings
+from frames import bgra_view
+
+
+# Screen capture backends. Every backend returns native BGRA frames (HxWx4 uint8)
+# for screen rectangles given as {'left', 'top', 'width', 'height'} dicts.
+
+
+class CaptureBackend:
+    """Source of screen pixels for ArknightsWindow."""
+    name = "base"
+    # True when the backend also knows where the game window is (e.g. replay)
+    provides_windows = False
+
+    def virtual_screen(self) -> Dict[str, int]:
+        """Bounding rect of all monitors, as cached by the current session."""
+        raise NotImplementedError
+
+    def grab(self, rect: Dict[str, int]) -> np.ndarray:
+        """Grab a screen rectangle as a native BGRA array."""
+        raise NotImplementedError
+
+    def locate_window(self, title: Optional[str]) -> Optional[Dict]:
+        """Window info dict (same keys as utils.get_window_info) if provides_windows."""
+        return None
+
+    def reset(self):
+        """Drop the calling thread's session so the next grab re-reads the display layout."""
+        self.close()
+
+    def close(self):
+        """Release resources held for the calling thread."""
+
+
+class MssBackend(CaptureBackend):
+    """mss-based capture (Windows/macOS/X11), one long-lived session per thread.
+
+    mss handles are bound to the thread that created them, so each capturing
+    thread (caller or background producer) keeps its own session.
+    """
+    name = "mss"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _session(self):
+        import mss
+        local = self._local
+        if getattr(local, 'sct', None) is None:
+            local.sct = mss.mss()
+            local.virtual_screen = dict(local.sct.monitors[0])
+            logger.debug(f"Capture session opened: virtual screen={local.virtual_screen}")
+        return local.sct
+
+    def virtual_screen(self) -> Dict[str, int]:
+        self._session()
+        return self._local.virtual_screen
+
+    def grab(self, rect: Dict[str, int]) -> np.ndarray:
+        """Grab with the session (zero-copy view), reopening it once on failure."""
+        import mss
+        try:
+            return bgra_view(self._session().grab(rect))
+        except mss.ScreenShotError as ex:
+            logger.debug(f"Grab failed ({ex}); reopening capture session")
+            self.close()
+            return bgra_view(self._session().grab(rect))
+
+    def close(self):
+        local = self._local
+        sct, local.sct = getattr(local, 'sct', None), None
+        if sct is not None:
+            try:
+                sct.close()
+            except Exception as ex:
+                logger.debug(f"Error closing capture session: {ex}")
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    # Leading fields of Xlib's XImage; only these are read
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+@_X_ERROR_HANDLER
+def _x_error_handler(display, event):
+    # Xlib's default handler exits the process; log and carry on instead
+    logger.debug("X11 error during shared-memory capture")
+    return 0
+
+
+class XShmBackend(CaptureBackend):
+    """Linux X11 capture through the MIT-SHM extension (XShmGetImage).
+
+    The server writes pixels straight into a shared-memory segment that is reused
+    between grabs of the same size, so frames are copied out of it once. Requires
+    libX11/libXext; one display connection per thread.
+    """
+    name = "xshm"
+
+    _IPC_PRIVATE = 0
+    _IPC_CREAT = 0o1000
+    _IPC_RMID = 0
+    _ZPIXMAP = 2
+    _ALL_PLANES = ctypes.c_ulong(~0 & 0xFFFFFFFFFFFFFFFF)
+
+    def __init__(self, display_name: Optional[str] = None):
+        x11_path = ctypes.util.find_library('X11')
+        xext_path = ctypes.util.find_library('Xext')
+        if not x11_path or not xext_path:
+            raise RuntimeError("XShmBackend requires libX11 and libXext")
+        self._display_name = display_name or os.environ.get('DISPLAY')
+        self._x11 = ctypes.CDLL(x11_path)
+        self._xext = ctypes.CDLL(xext_path)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._local = threading.local()
+        self._bind()
+        self._x11.XSetErrorHandler(_x_error_handler)
+
+    def _bind(self):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        x11.XInitThreads.restype = ctypes.c_int
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDestroyImage.argtypes = [ctypes.POINTER(_XImage)]
+        x11.XSetErrorHandler.argtypes = [_X_ERROR_HANDLER]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'display', None) is None:
+            display = self._x11.XOpenDisplay(self._display_name.encode() if self._display_name else None)
+            if not display:
+                raise RuntimeError(f"Cannot open X display {self._display_name!r}")
+            if not self._xext.XShmQueryExtension(display):
+                self._x11.XCloseDisplay(display)
+                raise RuntimeError("X server does not support MIT-SHM")
+            screen = self._x11.XDefaultScreen(display)
+            local.display = display
+            local.screen = screen
+            local.root = self._x11.XDefaultRootWindow(display)
+            local.virtual_screen = {
+                'left': 0, 'top': 0,
+                'width': self._x11.XDisplayWidth(display, screen),
+                'height': self._x11.XDisplayHeight(display, screen),
+            }
+            local.image = None
+            local.shminfo = None
+            logger.debug(f"XShm session opened: virtual screen={local.virtual_screen}")
+        return local
+
+    def _segment(self, local, width: int, height: int):
+        """Shared-memory XImage of the requested size (reused while the size is unchanged)."""
+        image = local.image
+        if image is not None and image.contents.width == width and image.contents.height == height:
+            return image
+        self._free_segment(local)
+        shminfo = _XShmSegmentInfo()
+        visual = self._x11.XDefaultVisual(local.display, local.screen)
+        depth = self._x11.XDefaultDepth(local.display, local.screen)
+        image = self._xext.XShmCreateImage(local.display, visual, depth, self._ZPIXMAP, None,
+                                           ctypes.byref(shminfo), width, height)
+        if not image:
+            raise RuntimeError("XShmCreateImage failed")
+        if image.contents.bits_per_pixel != 32:
+            self._x11.XDestroyImage(image)
+            raise RuntimeError(f"Unsupported X visual: {image.contents.bits_per_pixel} bpp")
+        size = image.contents.bytes_per_line * height
+        shminfo.shmid = self._libc.shmget(self._IPC_PRIVATE, size, self._IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            self._x11.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        addr = self._libc.shmat(shminfo.shmid, None, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            self._libc.shmctl(shminfo.shmid, self._IPC_RMID, None)
+            self._x11.XDestroyImage(image)
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        shminfo.shmaddr = addr
+        shminfo.readOnly = 0
+        image.contents.data = addr
+        self._xext.XShmAttach(local.display, ctypes.byref(shminfo))
+        self._x11.XSync(local.display, 0)
+        # Segment is freed by the kernel once both sides detach
+        self._libc.shmctl(shminfo.shmid, self._IPC_RMID, None)
+        local.image = image
+        local.shminfo = shminfo
+        return image
+
+    def _free_segment(self, local):
+        image, shminfo = local.image, local.shminfo
+        local.image = None
+        local.shminfo = None
+        if image is None:
+            return
+        self._xext.XShmDetach(local.display, ctypes.byref(shminfo))
+        self._x11.XSync(local.display, 0)
+        image.contents.data = None  # XDestroyImage must not free() the shared segment
+        self._x11.XDestroyImage(image)
+        self._libc.shmdt(shminfo.shmaddr)
+
+    def virtual_screen(self) -> Dict[str, int]:
+        return self._connection().virtual_screen
+
+    def grab(self, rect: Dict[str, int]) -> np.ndarray:
+        local = self._connection()
+        width, height = int(rect['width']), int(rect['height'])
+        image = self._segment(local, width, height)
+        if not self._xext.XShmGetImage(local.display, local.root, image,
+                                       int(rect['left']), int(rect['top']), self._ALL_PLANES):
+            raise RuntimeError(f"XShmGetImage failed for {rect}")
+        stride = image.contents.bytes_per_line
+        buf = (ctypes.c_ubyte * (stride * height)).from_address(image.contents.data)
+        rows = np.frombuffer(buf, dtype=np.uint8).reshape(height, stride)
+        # Copy out: the segment is overwritten by the next grab
+        return rows[:, :width * 4].reshape(height, width, 4).copy()
+
+    def close(self):
+        local = self._local
+        if getattr(local, 'display', None) is None:
+            return
+        try:
+            self._free_segment(local)
+            self._x11.XCloseDisplay(local.display)
+        except Exception as ex:
+            logger.debug(f"Error closing XShm session: {ex}")
+        local.display = None
+
+
+class ReplayBackend(CaptureBackend):
+    """Serves recorded window frames instead of the screen (offline tests/benchmarks).
+
+    `source` is a directory of images (png/jpg/bmp/npy, played in name order) or
+    an .npz recording with a `frames` array of HxWx3 RGB or HxWx4 BGRA images.
+    Frames advance on every full-window grab, or in real time when `fps` is set.
+    The backend also reports a window at (0, 0) of the frame size.
+    """
+    name = "replay"
+    provides_windows = True
+
+    _IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.npy')
+
+    def __init__(self, source: str, fps: Optional[float] = None, loop: bool = True):
+        self.source = source
+        self.fps = fps
+        self.loop = loop
+        self._frames = self._load(source)
+        if not self._frames:
+            raise ValueError(f"No frames found in replay source '{source}'")
+        self._index = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        h, w = self._frames[0].shape[:2]
+        self._size = (w, h)
+        logger.info(f"Replay backend loaded {len(self._frames)} frames ({w}x{h}) from {source}")
+
+    @staticmethod
+    def _to_bgra(img: np.ndarray) -> np.ndarray:
+        if img.ndim == 3 and img.shape[2] == 4:
+            return np.ascontiguousarray(img, dtype=np.uint8)
+        bgra = np.empty(img.shape[:2] + (4,), dtype=np.uint8)
+        bgra[:, :, :3] = img[:, :, 2::-1]  # RGB -> BGR
+        bgra[:, :, 3] = 255
+        return bgra
+
+    def _load(self, source: str) -> List[np.ndarray]:
+        if os.path.isfile(source) and source.endswith('.npz'):
+            with np.load(source) as data:
+                return [self._to_bgra(f) for f in data['frames']]
+        from PIL import Image
+        frames = []
+        for fname in sorted(os.listdir(source)):
+            path = os.path.join(source, fname)
+            ext = os.path.splitext(fname)[1].lower()
+            if ext not in self._IMAGE_EXTS:
+                continue
+            img = np.load(path) if ext == '.npy' else np.asarray(Image.open(path).convert('RGB'))
+            frames.append(self._to_bgra(img))
+        return frames
+
+    def _current(self, advance: bool) -> np.ndarray:
+        with self._lock:
+            if self.fps:
+                idx = int((time.monotonic() - self._started) * self.fps)
+            else:
+                idx = self._index
+                if advance:
+                    self._index += 1
+            idx = idx % len(self._frames) if self.loop else min(idx, len(self._frames) - 1)
+            return self._frames[idx]
+
+    def virtual_screen(self) -> Dict[str, int]:
+        w, h = self._size
+        return {'left': 0, 'top': 0, 'width': w, 'height': h}
+
+    def locate_window(self, title: Optional[str]) -> Optional[Dict]:
+        w, h = self._size
+        return {'left': 0, 'right': w, 'top': 0, 'bottom': h, 'width': w, 'height': h, 'title': title}
+
+    def grab(self, rect: Dict[str, int]) -> np.ndarray:
+        w, h = self._size
+        full_window = (rect['left'], rect['top'], rect['width'], rect['height']) == (0, 0, w, h)
+        frame = self._current(advance=full_window)
+        x, y = int(rect['left']), int(rect['top'])
+        return frame[y:y + int(rect['height']), x:x + int(rect['width'])]
+
+    def rewind(self):
+        with self._lock:
+            self._index = 0
+            self._started = time.monotonic()
+
+
+def save_recording(frames, path: str):
+    """Write native BGRA frames (e.g. from ArknightsWindow.frames) to an .npz for ReplayBackend."""
+    np.savez_compressed(path, frames=np.stack([np.ascontiguousarray(f) for f in frames]))
+
+
+BACKENDS = {
+    MssBackend.name: MssBackend,
+    XShmBackend.name: XShmBackend,
+    ReplayBackend.name: ReplayBackend,
+}
+
+
+def create_backend(name: str, **kwargs) -> CaptureBackend:
+    """Instantiate a capture backend by name ('mss', 'xshm', 'replay')."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown capture backend '{name}'; expected one of {sorted(BACKENDS)}")
+    return cls(**kwargs)
+
+
+def backend_from_settings() -> CaptureBackend:
+    """Backend selected by Settings.capture (backend name, replay_path)."""
+    cfg = Settings.capture
+    if cfg.backend == ReplayBackend.name:
+        return create_backend(cfg.backend, source=cfg.replay_path)
+    return create_backend(cfg.backend)
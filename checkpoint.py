@@ -0,0 +1,77 @@
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Settings
+from ledger import atomic_write_json, read_json, server_day
+from logger import logger
+
+
+# Step-level progress of the running daily task, rewritten atomically after every
+# completed step so a crashed run can pick up where it stopped (main.py --resume).
+
+_DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), 'checkpoint.json')
+
+
+@dataclass
+class Checkpoint:
+    account: str
+    day: str  # server day (ledger.server_day) the run belongs to
+    task: str  # ledger key of the task in progress
+    step: str  # last completed sub-step
+    state: str  # screen state after that step (states.*), UNKNOWN inside sub-screens
+    steps: List[str] = field(default_factory=list)  # completed sub-steps of the task, in order
+    counters: Dict[str, int] = field(default_factory=dict)  # e.g. friends visited
+    updated_at: str = ""
+
+
+class CheckpointStore:
+    """Reads and atomically writes the checkpoint of one account."""
+
+    def __init__(self, account: Optional[str] = None, server: Optional[str] = None, path: Optional[str] = None):
+        self.account = account or Settings.arknights.account
+        self.server = server or Settings.arknights.server
+        self.path = path or _DEFAULT_CHECKPOINT_PATH
+        self.current: Optional[Checkpoint] = None
+
+    def save(self, task: str, step: str, state: str, **counters) -> Checkpoint:
+        """Record a completed step; steps and counters accumulate while the task stays the same."""
+        cp = self.current
+        if cp is None or cp.task != task:
+            cp = Checkpoint(self.account, server_day(self.server).isoformat(), task, step, state)
+        cp.step, cp.state = step, state
+        if step not in cp.steps:
+            cp.steps.append(step)
+        cp.counters.update(counters)
+        cp.updated_at = datetime.now().isoformat(timespec='seconds')
+        atomic_write_json(self.path, asdict(cp))
+        self.current = cp
+        logger.debug(f"Checkpoint: {task}/{step} at {state} {cp.counters}")
+        return cp
+
+    def load(self) -> Optional[Checkpoint]:
+        """This account's checkpoint from the current server day, if any."""
+        data = read_json(self.path)
+        if not isinstance(data, dict):
+            return None
+        try:
+            cp = Checkpoint(**data)
+        except TypeError as ex:
+            logger.warning(f"Ignoring malformed checkpoint {self.path}: {ex}")
+            return None
+        if cp.account != self.account:
+            logger.info(f"Checkpoint belongs to account '{cp.account}', not '{self.account}'")
+            return None
+        if cp.day != server_day(self.server).isoformat():
+            logger.info(f"Checkpoint is from server day {cp.day}; the daily reset has passed since")
+            return None
+        self.current = cp
+        return cp
+
+    def clear(self):
+        self.current = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -14,7 +14,23 @@ class Timeouts:
     long_timeout: float = 30.0
     check_interval_min: float = 0.05
     check_interval_max: float = 0.15
-    stability_frames: int = 2  # require N consecutive confirmations
+    stability_frames: int = 2  # require N consecutive confirmations on distinct frames
+    stability_ms: float = 0.0  # optionally also require the confirmations to span this long
+    # With background capture running, poll once per new frame instead of sleeping
+    wait_on_frames: bool = True
+    # Waits given a watch region reuse the last result while that region is unchanged
+    skip_unchanged_frames: bool = True
+    # wait_until_stable defaults: how long the region must stay still, the per-channel
+    # difference (0..255) above which a pixel counts as changed, and the fraction of
+    # changed pixels still treated as "no change" (compression/antialiasing noise)
+    settle_ms: float = 300.0
+    settle_pixel_tolerance: int = 16
+    settle_changed_fraction: float = 0.001
+    # Long waits (battles) re-check their cheap cue at the normal poll rate, backing
+    # off to at most this interval; bounds how late the awaited screen is noticed
+    long_wait_interval: float = 0.5
+    # Loose confidence at which an element's colors count as "about to appear"
+    long_wait_cue_confidence: float = 0.8
 
 
 @dataclass(frozen=True)
@@ -29,6 +45,11 @@ class Colors:
 class Clicks:
     jitter_radius_px: int = 3  # randomize click within this radius
     post_click_grace_ms: int = 80  # short grace after click
+    # Event source: 'pyautogui' (default), 'xtest' (Linux X11) or 'recording' (no real input)
+    input_backend: str = "pyautogui"
+    # Deliver clicks from a worker thread; click-then-verify calls start checking
+    # frames captured after delivery instead of sleeping post_click_grace_ms
+    async_dispatch: bool = True
 
 
 @dataclass(frozen=True)
@@ -47,6 +68,23 @@ class Observability:
     annotation_thickness_px: int = 2
 
 
+@dataclass(frozen=True)
+class Capture:
+    # 'window': grab only the game window rectangle from the backend
+    # 'full': grab the whole virtual screen and crop (original behavior)
+    mode: str = "window"
+    # Optional background capture thread publishing into a ring of recent frames
+    background_thread: bool = False
+    fps: float = 30.0
+    ring_size: int = 4
+    # Window geometry lookups are cached this long; odd captures invalidate early
+    window_geometry_ttl_ms: float = 500.0
+    # Pixel source: 'mss' (default), 'xshm' (Linux X11 shared memory) or 'replay'
+    backend: str = "mss"
+    # Directory of frames or .npz recording served by the 'replay' backend
+    replay_path: str = ""
+
+
 # Logging configuration (levels as strings: DEBUG, INFO, WARNING, ERROR)
 @dataclass(frozen=True)
 class Logging:
@@ -58,6 +96,13 @@ class Logging:
 # Gameplay/automation knobs for Arknights scenarios
 @dataclass(frozen=True)
 class ArknightsSettings:
+    # Account whose daily progress is tracked, and its server (sets the daily reset time:
+    # 'global', 'cn', 'tw', 'jp' or 'kr')
+    account: str = "default"
+    server: str = "global"
+    # Skip tasks already recorded as done since the last reset (see ledger.py)
+    skip_completed_dailies: bool = True
+
     # Recruitment
     use_expedite: bool = False
     finish_on_recruitment: bool = True
@@ -128,6 +173,7 @@ class Settings:
     clicks = Clicks()
     safety = Safety()
     observability = Observability()
+    capture = Capture()
     logging = Logging()
     arknights = ArknightsSettings()
     animation = AnimationSettings()
@@ -147,6 +193,7 @@ def save_user_settings(path: Optional[str] = None) -> bool:
             'animation': asdict(Settings.animation),
             'safety': asdict(Settings.safety),
             'observability': asdict(Settings.observability),
+            'capture': asdict(Settings.capture),
         }
         with open(p, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2)
@@ -172,6 +219,8 @@ def load_user_settings(path: Optional[str] = None) -> bool:
             Settings.safety = replace(Settings.safety, **data['safety'])
         if 'observability' in data:
             Settings.observability = replace(Settings.observability, **data['observability'])
+        if 'capture' in data:
+            Settings.capture = replace(Settings.capture, **data['capture'])
         return True
     except Exception:
         return False
@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def rgb_to_native(rgb: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    """Convert an RGB tuple to the capture backend's native BGR channel order."""
+    r, g, b = rgb
+    return (int(b), int(g), int(r))
 
 
 @dataclass
@@ -12,8 +22,19 @@ class UIElement:
     # Optional template image path and threshold for matchTemplate
     template_path: Optional[str] = None
     template_threshold: float = 0.85
+    # Optional template search area (x, y, w, h); whole window if None
+    search_roi: Optional[Tuple[int, int, int, int]] = None
+    # Candidate template-pixel -> base-pixel factors, for templates not cut at 1920x1080
+    template_scales: Tuple[float, ...] = (1.0,)
     # Optional preferred click coordinates
     click_coords: Optional[Tuple[int, int]] = None
+    # pixel_points with expected colors pre-converted to native BGR (derived)
+    native_points: Optional[List[Tuple[int, int, Tuple[int, int, int]]]] = field(
+        default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.pixel_points:
+            self.native_points = [(x, y, rgb_to_native(tuple(rgb))) for (x, y, rgb) in self.pixel_points]
 
 
 def _as_rgb(rgb_or_none):
@@ -111,6 +132,23 @@ ELEMENTS: Dict[str, UIElement] = {
     "recruitment_tag_4": UIElement(name="recruitment_tag_4", pixel_points=[(767, 684, (49, 49, 49))], click_coords=(767, 684)),
     "recruitment_tag_5": UIElement(name="recruitment_tag_5", pixel_points=[(1015, 681, (49, 49, 49))], click_coords=(1015, 681)),
 
+    # Guaranteed-rarity tags, found by template anywhere in the tag area. The bundled
+    # crops were not taken at 1920x1080, so a few scales are tried (the hit is remembered).
+    "senior_operator_tag": UIElement(
+        name="senior_operator_tag",
+        template_path="images/senior_operator.png",
+        template_threshold=0.8,
+        search_roi=(620, 520, 800, 220),
+        template_scales=(1.0, 0.9, 0.8, 0.7, 0.6),
+    ),
+    "top_operator_tag": UIElement(
+        name="top_operator_tag",
+        template_path="images/top_operator.png",
+        template_threshold=0.8,
+        search_roi=(620, 520, 800, 220),
+        template_scales=(0.9, 0.8, 0.7, 0.6, 1.0),
+    ),
+
     # Recruitment permit check offset from tile center: (tile.x-105, tile.y+25)
     "recruitment_permit_1": UIElement(name="recruitment_permit_1", pixel_points=[(381, 460, (255, 255, 255))], click_coords=(381, 460)),
     "recruitment_permit_2": UIElement(name="recruitment_permit_2", pixel_points=[(1328, 460, (255, 255, 255))], click_coords=(1328, 460)),
@@ -279,6 +317,16 @@ ELEMENTS: Dict[str, UIElement] = {
         pixel_points=[(1340, 70, (255, 255, 255))],
         click_coords=(1735, 950),
     ),
+    # Pause and speed buttons, top right of the battle HUD: only shown once a battle runs.
+    # Positions are estimates not yet checked against a captured battle frame; a miss
+    # only costs Terminal its HUD-based battle-over cue (see Terminal._wait_battle_start)
+    "battle_hud": UIElement(
+        name="battle_hud",
+        pixel_points=[
+            (1840, 65, (255, 255, 255)),  # Pause
+            (1690, 65, (255, 255, 255)),  # Speed
+        ],
+    ),
     "mission_complete_screen": UIElement(
         name="mission_complete_screen",
         pixel_points=[
@@ -355,3 +403,50 @@ def get_element(name: str) -> Optional[UIElement]:
     return ELEMENTS.get(name)
 
 
+@dataclass(frozen=True)
+class ElementTable:
+    """Every pixel anchor of a registry packed into contiguous arrays.
+
+    Rows of one element are contiguous; `slices` maps element name to its rows.
+    `scaled_xy` is filled per window resolution (see ArknightsWindow.element_table).
+    """
+    names: Tuple[str, ...]
+    base_xy: np.ndarray  # int32 [N, 2], base 1920x1080 coords
+    expected_native: np.ndarray  # uint8 [N, 3], BGR
+    slices: Dict[str, slice]
+    scaled_xy: Optional[np.ndarray] = None  # intp [N, 2], window-relative
+    _row_cache: Dict[Tuple[str, ...], np.ndarray] = field(default_factory=dict, repr=False, compare=False)
+
+    def rows(self, names: Sequence[str]) -> np.ndarray:
+        """Row indices for several elements, concatenated in the given order (cached)."""
+        key = tuple(names)
+        rows = self._row_cache.get(key)
+        if rows is None:
+            parts = [np.arange(self.slices[n].start, self.slices[n].stop) for n in key]
+            rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.intp)
+            self._row_cache[key] = rows
+        return rows
+
+
+def compile_elements(elements: Optional[Dict[str, UIElement]] = None) -> ElementTable:
+    """Pack pixel anchors of `elements` (default: ELEMENTS) into an ElementTable."""
+    elements = ELEMENTS if elements is None else elements
+    xy: List[Tuple[int, int]] = []
+    colors: List[Tuple[int, int, int]] = []
+    slices: Dict[str, slice] = {}
+    for name, el in elements.items():
+        if not el.native_points:
+            continue
+        start = len(xy)
+        for (x, y, bgr) in el.native_points:
+            xy.append((x, y))
+            colors.append(bgr)
+        slices[name] = slice(start, len(xy))
+    return ElementTable(
+        names=tuple(slices),
+        base_xy=np.array(xy, dtype=np.int32).reshape(-1, 2),
+        expected_native=np.array(colors, dtype=np.uint8).reshape(-1, 3),
+        slices=slices,
+    )
+
+
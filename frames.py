@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+from logger import logger
+
+
+@dataclass(frozen=True)
+class Frame:
+    frame_id: int  # monotonically increasing per ring
+    timestamp: float  # time.monotonic() when the grab finished
+    image: np.ndarray  # native BGRA, usually a zero-copy view of the backend buffer
+
+
+class FrameRing:
+    """Small thread-safe ring of the most recent frames.
+
+    Producers publish images; consumers read the newest frame without blocking,
+    or block until a frame newer than one they have already seen arrives.
+    """
+
+    def __init__(self, size: int = 4):
+        self._frames = deque(maxlen=max(1, int(size)))
+        self._cond = threading.Condition()
+        self._next_id = 1
+
+    @property
+    def size(self) -> int:
+        return self._frames.maxlen
+
+    def publish(self, image: np.ndarray, timestamp: Optional[float] = None) -> Frame:
+        with self._cond:
+            frame = Frame(self._next_id, time.monotonic() if timestamp is None else timestamp, image)
+            self._next_id += 1
+            self._frames.append(frame)
+            self._cond.notify_all()
+        return frame
+
+    def latest(self) -> Optional[Frame]:
+        # deque indexing is atomic; no lock needed for a snapshot read
+        try:
+            return self._frames[-1]
+        except IndexError:
+            return None
+
+    def frames(self) -> List[Frame]:
+        with self._cond:
+            return list(self._frames)
+
+    def wait_newer(self, after_id: int, timeout: float) -> Optional[Frame]:
+        """Block until a frame with id > after_id exists; None on timeout."""
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._cond:
+            while True:
+                frame = self._frames[-1] if self._frames else None
+                if frame is not None and frame.frame_id > after_id:
+                    return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+
+class FrameProducer:
+    """Background thread that calls a grab function at a fixed rate.
+
+    The grab function is expected to publish into a FrameRing itself (as
+    ArknightsWindow.make_screenshot does), so synchronous and background captures
+    share one frame-id sequence.
+    """
+
+    def __init__(self, grab: Callable[[], object], fps: float = 30.0,
+                 on_stop: Optional[Callable[[], None]] = None, name: str = "frame-producer"):
+        self._grab = grab
+        self.interval = 1.0 / max(0.1, float(fps))
+        self._on_stop = on_stop
+        self._name = name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+        logger.debug(f"Frame producer started at {1.0 / self.interval:.1f} fps")
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        logger.debug("Frame producer stopped")
+
+    def _run(self):
+        failures = 0
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    self._grab()
+                    failures = 0
+                except Exception as ex:
+                    failures += 1
+                    if failures == 1:
+                        logger.warning(f"Frame producer grab failed: {ex}")
+                # Back off while grabs keep failing (e.g. window gone)
+                delay = self.interval * min(10, 1 + failures) - (time.monotonic() - started)
+                if delay > 0:
+                    self._stop.wait(delay)
+        finally:
+            if self._on_stop:
+                try:
+                    self._on_stop()
+                except Exception:
+                    pass
+
+
+def bgra_view(shot) -> np.ndarray:
+    """Wrap an mss ScreenShot's raw BGRA buffer as an HxWx4 array without copying."""
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+def rgb_view(bgra: np.ndarray) -> np.ndarray:
+    """Strided HxWx3 RGB view of a native BGRA frame (no copy)."""
+    return bgra[:, :, 2::-1]
+
+
+class ChangeDetector:
+    """Tells whether the watched regions of a frame differ from the last frame seen.
+
+    Each region is sampled every `step` pixels; the samples of the previous
+    frame are kept and compared exactly (or within `tolerance`, as the mean
+    absolute difference). `rois` is a list of (x1, y1, x2, y2) frame rects, or a
+    callable returning one so rects can follow window resizes; None watches the
+    whole frame.
+    """
+
+    def __init__(self, rois=None, step: int = 4, tolerance: float = 0.0):
+        self._rois = rois
+        self.step = max(1, int(step))
+        self.tolerance = float(tolerance)
+        self._last: Optional[List[np.ndarray]] = None
+
+    def reset(self):
+        self._last = None
+
+    def _signature(self, image: np.ndarray) -> List[np.ndarray]:
+        rois = self._rois() if callable(self._rois) else self._rois
+        if rois is None:
+            rois = [(0, 0, image.shape[1], image.shape[0])]
+        s = self.step
+        # Colour channels only; copies are tiny and survive buffer reuse
+        return [image[y1:y2:s, x1:x2:s, :3].copy() for (x1, y1, x2, y2) in rois]
+
+    def changed(self, image: np.ndarray) -> bool:
+        """Record `image` and return True if it differs from the previous one (or is the first)."""
+        sig = self._signature(image)
+        last, self._last = self._last, sig
+        if last is None or len(last) != len(sig):
+            return True
+        for a, b in zip(last, sig):
+            if a.shape != b.shape:
+                return True
+            if self.tolerance <= 0:
+                if not np.array_equal(a, b):
+                    return True
+            elif a.size and np.abs(a.astype(np.int16) - b).mean() > self.tolerance:
+                return True
+        return False
@@ -0,0 +1,219 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from logger import logger
+from config import Settings
+
+
+# Input backends deliver clicks/key presses at absolute screen coordinates.
+# Timing (grace periods, jitter) stays in ArknightsWindow; backends only send events.
+
+
+class InputBackend:
+    """Sink for synthetic mouse/keyboard events."""
+    name = "base"
+
+    def click(self, x: int, y: int):
+        """Move to absolute screen coords (x, y) and left-click."""
+        raise NotImplementedError
+
+    def press(self, key: str):
+        """Press and release a key (pyautogui key names, e.g. 'esc')."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the backend."""
+
+
+class PyAutoGuiBackend(InputBackend):
+    """pyautogui, without its per-call PAUSE sleep (our own grace delays apply instead)."""
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui  # imported lazily: pulls in platform GUI libraries
+        pyautogui.FAILSAFE = False  # Nothing can possibly go wrong with this, right?
+        self._pg = pyautogui
+
+    def click(self, x: int, y: int):
+        self._pg.click(x, y, _pause=False)
+
+    def press(self, key: str):
+        self._pg.press(key, _pause=False)
+
+
+class XTestBackend(InputBackend):
+    """Linux X11 input through the XTEST extension (libXtst via ctypes).
+
+    Events are queued on the display connection and flushed once per call; no
+    sleeps or round-trips. One connection per calling thread.
+    """
+    name = "xtest"
+
+    _CURRENT_TIME = 0
+    _LEFT_BUTTON = 1
+    # pyautogui key names that differ from X keysym names
+    _KEYSYMS = {
+        'esc': 'Escape', 'escape': 'Escape', 'enter': 'Return', 'return': 'Return',
+        'space': 'space', 'tab': 'Tab', 'backspace': 'BackSpace',
+        'up': 'Up', 'down': 'Down', 'left': 'Left', 'right': 'Right',
+    }
+
+    def __init__(self, display_name: Optional[str] = None):
+        x11_path = ctypes.util.find_library('X11')
+        xtst_path = ctypes.util.find_library('Xtst')
+        if not x11_path or not xtst_path:
+            raise RuntimeError("XTestBackend requires libX11 and libXtst")
+        self._display_name = display_name or os.environ.get('DISPLAY')
+        self._x11 = ctypes.CDLL(x11_path)
+        self._xtst = ctypes.CDLL(xtst_path)
+        self._local = threading.local()
+        x11, xtst = self._x11, self._xtst
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XStringToKeysym.argtypes = [ctypes.c_char_p]
+        x11.XStringToKeysym.restype = ctypes.c_ulong
+        x11.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XKeysymToKeycode.restype = ctypes.c_ubyte
+        xtst.XTestQueryExtension.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 4
+        xtst.XTestFakeMotionEvent.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+        xtst.XTestFakeButtonEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+        xtst.XTestFakeKeyEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+
+    def _display(self):
+        display = getattr(self._local, 'display', None)
+        if display is None:
+            display = self._x11.XOpenDisplay(self._display_name.encode() if self._display_name else None)
+            if not display:
+                raise RuntimeError(f"Cannot open X display {self._display_name!r}")
+            dummy = [ctypes.c_int() for _ in range(4)]
+            if not self._xtst.XTestQueryExtension(display, *[ctypes.byref(d) for d in dummy]):
+                self._x11.XCloseDisplay(display)
+                raise RuntimeError("X server does not support XTEST")
+            self._local.display = display
+        return display
+
+    def click(self, x: int, y: int):
+        display = self._display()
+        # screen -1: coordinates are relative to the screen the pointer is on
+        self._xtst.XTestFakeMotionEvent(display, -1, int(x), int(y), self._CURRENT_TIME)
+        self._xtst.XTestFakeButtonEvent(display, self._LEFT_BUTTON, 1, self._CURRENT_TIME)
+        self._xtst.XTestFakeButtonEvent(display, self._LEFT_BUTTON, 0, self._CURRENT_TIME)
+        self._x11.XFlush(display)
+
+    def press(self, key: str):
+        display = self._display()
+        keysym = self._x11.XStringToKeysym(self._KEYSYMS.get(key.lower(), key).encode())
+        keycode = self._x11.XKeysymToKeycode(display, keysym) if keysym else 0
+        if not keycode:
+            raise ValueError(f"No X keycode for key '{key}'")
+        self._xtst.XTestFakeKeyEvent(display, keycode, 1, self._CURRENT_TIME)
+        self._xtst.XTestFakeKeyEvent(display, keycode, 0, self._CURRENT_TIME)
+        self._x11.XFlush(display)
+
+    def close(self):
+        display = getattr(self._local, 'display', None)
+        self._local.display = None
+        if display is not None:
+            self._x11.XCloseDisplay(display)
+
+
+class RecordingBackend(InputBackend):
+    """Records events instead of sending them (tests, replay runs, latency baselines)."""
+    name = "recording"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (kind, payload, time.monotonic()) with kind 'click' or 'press'
+        self.events: List[Tuple[str, object, float]] = []
+
+    def click(self, x: int, y: int):
+        with self._lock:
+            self.events.append(('click', (int(x), int(y)), time.monotonic()))
+
+    def press(self, key: str):
+        with self._lock:
+            self.events.append(('press', key, time.monotonic()))
+
+    @property
+    def clicks(self) -> List[Tuple[int, int]]:
+        with self._lock:
+            return [payload for kind, payload, _ in self.events if kind == 'click']
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+
+
+class ClickDispatcher:
+    """Delivers clicks from a worker thread so callers never block on the input backend.
+
+    submit() returns a Future resolved with the time.monotonic() timestamp at which
+    the click was delivered (the backend call returned), or with the backend's
+    exception. Clicks are delivered in submission order.
+    """
+
+    def __init__(self, deliver: Callable[[int, int], None], name: str = "click-dispatcher"):
+        self._deliver = deliver
+        self._queue: "queue.Queue[Optional[Tuple[Future, int, int]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def is_running(self) -> bool:
+        return self._thread.is_alive()
+
+    def submit(self, x: int, y: int) -> Future:
+        fut: Future = Future()
+        self._queue.put((fut, int(x), int(y)))
+        return fut
+
+    def stop(self, timeout: float = 1.0):
+        """Deliver what is already queued, then stop the worker."""
+        self._queue.put(None)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fut, x, y = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                self._deliver(x, y)
+                fut.set_result(time.monotonic())
+            except Exception as ex:
+                logger.warning(f"Click at ({x},{y}) failed: {ex}")
+                fut.set_exception(ex)
+
+
+BACKENDS = {
+    PyAutoGuiBackend.name: PyAutoGuiBackend,
+    XTestBackend.name: XTestBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def create_input_backend(name: str, **kwargs) -> InputBackend:
+    """Instantiate an input backend by name ('pyautogui', 'xtest', 'recording')."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown input backend '{name}'; expected one of {sorted(BACKENDS)}")
+    return cls(**kwargs)
+
+
+def input_backend_from_settings() -> InputBackend:
+    """Backend selected by Settings.clicks.input_backend."""
+    backend = create_input_backend(Settings.clicks.input_backend)
+    logger.debug(f"Input backend: {backend.name}")
+    return backend
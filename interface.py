@@ -73,6 +73,9 @@ class PRTSInterface:
                 ("Purchase Order", "arknights.store_based_on"),
                 ("Rarity Priority", "arknights.store_rarity_priority"),
             ]),
+            ("Run All", [
+                ("Skip Tasks Done Today", "arknights.skip_completed_dailies"),
+            ]),
         ]
 
     def _automation_flat_items(self) -> List[Tuple[str, str]]:
@@ -560,6 +563,8 @@ class PRTSInterface:
             return bool(Settings.arknights.finish_on_recruitment)
         if path == 'arknights.use_total_proxy':
             return bool(Settings.arknights.use_total_proxy)
+        if path == 'arknights.skip_completed_dailies':
+            return bool(Settings.arknights.skip_completed_dailies)
         if path == 'arknights.store_based_on':
             return list(Settings.arknights.store_based_on)
         if path == 'arknights.store_rarity_priority':
@@ -639,6 +644,14 @@ class PRTSInterface:
             except Exception:
                 pass
             return
+        if path == 'arknights.skip_completed_dailies':
+            cur = Settings.arknights
+            Settings.arknights = replace(cur, skip_completed_dailies=not cur.skip_completed_dailies)
+            try:
+                save_user_settings()
+            except Exception:
+                pass
+            return
         # list settings handled in _handle_automation_key via rotation
 
     def _draw_settings(self):
@@ -945,6 +958,7 @@ class PRTSInterface:
         self._init_colors()
         # Load settings on startup
         load_user_settings()
+        ark_window.apply_capture_settings()
 
         last_clock = 0.0
         # Boot sequence first
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from config import Settings
+from logger import logger
+
+
+# Per-account record of which daily tasks finished since the last server reset,
+# so re-runs (e.g. after a crash) skip them without navigating anywhere.
+
+_DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), 'daily_ledger.json')
+
+# Server daily reset: (UTC offset in hours, local reset hour)
+SERVER_RESETS = {
+    "global": (-7, 4),
+    "cn": (8, 4),
+    "tw": (8, 4),
+    "jp": (9, 4),
+    "kr": (9, 4),
+}
+
+
+def server_day(server: Optional[str] = None, now: Optional[datetime] = None) -> date:
+    """The game day `now` belongs to: the date of the last reset, in server time."""
+    server = server or Settings.arknights.server
+    if server not in SERVER_RESETS:
+        logger.warning(f"Unknown server '{server}'; using the global reset time")
+        server = "global"
+    offset, reset_hour = SERVER_RESETS[server]
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.astimezone()
+    return (now.astimezone(timezone.utc) + timedelta(hours=offset - reset_hour)).date()
+
+
+def atomic_write_json(path: str, data: Any):
+    """Write JSON through a temp file in the same directory and rename it into place.
+
+    Readers see the old or the new file, never a partial one, even if the process dies mid-write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path: str) -> Optional[Any]:
+    """Contents of a JSON file, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as ex:
+        logger.warning(f"Ignoring unreadable {path}: {ex}")
+        return None
+
+
+class DailyLedger:
+    """Completed daily tasks of one account for the current server day.
+
+    File layout: {account: {"day": "YYYY-MM-DD", "tasks": {key: {"done_at": iso, "observed": {...}}}}}.
+    Entries from an earlier day are dropped on first access after the reset.
+    """
+
+    def __init__(self, account: Optional[str] = None, server: Optional[str] = None, path: Optional[str] = None):
+        self.account = account or Settings.arknights.account
+        self.server = server or Settings.arknights.server
+        self.path = path or _DEFAULT_LEDGER_PATH
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        data = read_json(self.path)
+        return data if isinstance(data, dict) else {}
+
+    def _tasks(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        entry = data.get(self.account)
+        today = server_day(self.server).isoformat()
+        if not isinstance(entry, dict) or entry.get("day") != today:
+            entry = data[self.account] = {"day": today, "tasks": {}}
+        return entry["tasks"]
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """{key: {"done_at", "observed"}} for tasks finished this server day."""
+        with self._lock:
+            return dict(self._tasks(self._load()))
+
+    def is_done(self, key: str) -> bool:
+        return key in self.completed()
+
+    def observed(self, key: str) -> Dict[str, Any]:
+        return self.completed().get(key, {}).get("observed", {})
+
+    def record(self, key: str, **observed):
+        """Mark a task done for this server day, with what it observed (JSON-serializable values)."""
+        with self._lock:
+            data = self._load()
+            self._tasks(data)[key] = {"done_at": datetime.now().isoformat(timespec='seconds'), "observed": observed}
+            atomic_write_json(self.path, data)
+        logger.debug(f"Ledger [{self.account}] {key} done: {observed}")
+
+    def clear(self):
+        """Forget this account's completions for the current day."""
+        with self._lock:
+            data = self._load()
+            data[self.account] = {"day": server_day(self.server).isoformat(), "tasks": {}}
+            atomic_write_json(self.path, data)
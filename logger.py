@@ -1,5 +1,6 @@
 import logging as _logging
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from config import Settings
 
@@ -110,6 +111,28 @@ def set_logging_enabled(enabled: bool):
     from dataclasses import replace
     Settings.logging = replace(Settings.logging, enabled=bool(enabled))
 
+class _ThreadDebugFilter(_logging.Filter):
+    """Drops DEBUG records emitted by one thread."""
+
+    def __init__(self, thread_id: int):
+        super().__init__()
+        self.thread_id = thread_id
+
+    def filter(self, record: _logging.LogRecord) -> bool:
+        return record.levelno > _logging.DEBUG or record.thread != self.thread_id
+
+
+@contextmanager
+def suppress_debug():
+    """Silence DEBUG output from the calling thread (e.g. per-poll chatter in long waits)."""
+    import threading
+    f = _ThreadDebugFilter(threading.get_ident())
+    logger.addFilter(f)
+    try:
+        yield
+    finally:
+        logger.removeFilter(f)
+
 # Add handlers to logger
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
@@ -1,10 +1,28 @@
+import argparse
 import sys
 from interface import run_console
 
 
+def resume_dailies():
+    """Continue an interrupted "Run All Dailies" from its last checkpoint, without the console."""
+    from config import load_user_settings
+    from scenarios import TaskAggregator
+    from utils import ark_window
+    load_user_settings()
+    ark_window.apply_capture_settings()
+    TaskAggregator().run_all_dailies(resume=True)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="PRTS console for Arknights daily automation")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue the last interrupted daily run from its checkpoint, then exit")
+    args = parser.parse_args()
     try:
-        run_console()
+        if args.resume:
+            resume_dailies()
+        else:
+            run_console()
     except KeyboardInterrupt:
         print("\nExiting PRTS console...")
         sys.exit(0)
@@ -0,0 +1,170 @@
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from logger import logger
+
+
+# "Which of these colors is this pixel?" decisions, answered with one lookup per pixel.
+# RGB is quantized to `bits` per channel; each quantized cell stores the label of the
+# nearest palette color (or -1) and its similarity, computed once at the cell center.
+# Similarity is the repo-wide 1 - RGB distance / max distance. Cells whose decision
+# could change somewhere inside the cell (near the confidence radius, between two
+# palette colors, across a rule threshold) are flagged and their pixels are decided
+# exactly, so results match a direct per-pixel comparison.
+
+_MAX_DISTANCE = math.sqrt(3 * 255 ** 2)
+_UNKNOWN = -1
+
+Rule = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+class PaletteClassifier:
+    """Maps RGB pixels (uint8[..., 3]) to palette labels.
+
+    Build through palette_classifier()/rule_classifier(), which cache instances.
+    """
+
+    def __init__(self, labels: Sequence[str], lut: Optional[np.ndarray], scores: Optional[np.ndarray],
+                 bits: int, ambiguous: Optional[np.ndarray] = None,
+                 exact: Optional[Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]] = None):
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.bits = bits
+        self._lut = lut  # int8[cells], label index or -1
+        self._scores = scores  # uint8[cells], similarity * 255
+        self._ambiguous = ambiguous  # bool[cells], decided per pixel by `exact`
+        self._exact = exact  # int32 RGB[N, 3] -> (label index, similarity), the direct computation
+
+    @classmethod
+    def from_palette(cls, palette: Dict[str, Tuple[int, int, int]], confidence: float,
+                     bits: int = 5) -> 'PaletteClassifier':
+        labels = list(palette)
+        colors = np.array([palette[n] for n in labels], dtype=np.int32).reshape(-1, 3)
+
+        def exact(rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            diff = rgb[:, None, :] - colors[None, :, :]
+            sim = 1.0 - np.sqrt((diff * diff).sum(axis=-1)) / _MAX_DISTANCE
+            best = sim.argmax(axis=1)
+            best_sim = sim[np.arange(len(rgb)), best]
+            return np.where(best_sim >= confidence, best, _UNKNOWN), best_sim
+
+        if confidence >= 1.0:
+            # A quantized table cannot express exact equality; compare directly instead
+            return cls(labels, None, None, bits, exact=exact)
+        centers = _cell_centers(bits)
+        diff = centers[:, None, :] - colors[None, :, :].astype(np.float32)
+        dist = np.sqrt((diff * diff).sum(axis=-1))
+        order = np.argsort(dist, axis=1)
+        rows = np.arange(len(centers))
+        best, d1 = order[:, 0], dist[rows, order[:, 0]]
+        d2 = dist[rows, order[:, 1]] if len(labels) > 1 else np.full(len(centers), np.inf, dtype=np.float32)
+        best_sim = 1.0 - d1 / _MAX_DISTANCE
+        lut = np.where(best_sim >= confidence, best, _UNKNOWN).astype(np.int8)
+        scores = np.round(np.clip(best_sim, 0.0, 1.0) * 255).astype(np.uint8)
+        # Any pixel of a cell lies within half a cell diagonal of its center
+        reach = _half_diagonal(bits)
+        radius = (1.0 - confidence) * _MAX_DISTANCE
+        ambiguous = (np.abs(d1 - radius) <= reach) | (d2 - d1 <= 2 * reach)
+        return cls(labels, lut, scores, bits, ambiguous, exact)
+
+    @classmethod
+    def from_rules(cls, rules: Sequence[Tuple[str, Rule]], bits: int = 5) -> 'PaletteClassifier':
+        """Rules are (label, predicate(r, g, b) -> bool array); the first matching rule wins.
+
+        Cells are labeled from their corners; a cell whose corners disagree (a threshold
+        runs through it) is decided per pixel. Exact for threshold-style rules.
+        """
+        def exact(rgb: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            idx = np.full(len(rgb), _UNKNOWN)
+            for i, (_, rule) in enumerate(rules):
+                idx[(idx == _UNKNOWN) & np.asarray(rule(rgb[:, 0], rgb[:, 1], rgb[:, 2]), dtype=bool)] = i
+            return idx, (idx != _UNKNOWN).astype(np.float32)
+
+        step = 1 << (8 - bits)
+        low = _cell_centers(bits) - (step - 1) / 2.0
+        corners = [exact(low + np.array(offset) * (step - 1))[0]
+                   for offset in np.ndindex(2, 2, 2)]
+        lut = corners[0].astype(np.int8)
+        ambiguous = np.any([c != corners[0] for c in corners[1:]], axis=0)
+        scores = np.where(lut != _UNKNOWN, 255, 0).astype(np.uint8)
+        return cls([label for label, _ in rules], lut, scores, bits, ambiguous, exact)
+
+    def _cells(self, rgb: np.ndarray) -> np.ndarray:
+        q = rgb.astype(np.int32) >> (8 - self.bits)
+        return (q[..., 0] << (2 * self.bits)) | (q[..., 1] << self.bits) | q[..., 2]
+
+    def indices(self, rgb) -> Tuple[np.ndarray, np.ndarray]:
+        """(label index or -1, similarity 0..1) for every pixel of an RGB array [..., 3]."""
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        if self._lut is None:
+            idx, score = self._exact(rgb.reshape(-1, 3).astype(np.int32))
+            return idx.reshape(rgb.shape[:-1]), score.reshape(rgb.shape[:-1])
+        cells = self._cells(rgb)
+        idx = self._lut.take(cells).astype(np.int32)
+        score = self._scores.take(cells) / np.float32(255)
+        unsure = self._ambiguous.take(cells)
+        if unsure.any():
+            idx[unsure], score[unsure] = self._exact(rgb[unsure].astype(np.int32))
+        return idx, score
+
+    def classify(self, rgb, default: Optional[str] = None) -> List[Optional[str]]:
+        """Label of each pixel (flattened), `default` where no palette color is close enough."""
+        idx, _ = self.indices(rgb)
+        return [self.labels[i] if i != _UNKNOWN else default for i in idx.ravel()]
+
+    def classify_one(self, rgb, default: Optional[str] = None) -> Optional[str]:
+        return self.classify(np.asarray(rgb, dtype=np.uint8).reshape(1, 3), default)[0]
+
+    def best_of(self, rgb, default: Optional[str] = None) -> List[Optional[str]]:
+        """One label per row of an RGB array [N, S, 3]: the label of its most similar sample."""
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        idx, score = self.indices(rgb)
+        known = idx != _UNKNOWN
+        if self._lut is not None and known.any():
+            # Table scores are per cell; rank the matched samples by their exact similarity
+            score[known] = self._exact(rgb[known].astype(np.int32))[1]
+        score = np.where(known, score, -1.0)
+        pick = score.argmax(axis=1)
+        best = idx[np.arange(idx.shape[0]), pick]
+        return [self.labels[i] if i != _UNKNOWN else default for i in best]
+
+
+def _cell_centers(bits: int) -> np.ndarray:
+    """float32[(2**bits)**3, 3] RGB value at the center of every quantized cell."""
+    step = 1 << (8 - bits)
+    axis = np.arange(1 << bits, dtype=np.float32) * step + (step - 1) / 2.0
+    r, g, b = np.meshgrid(axis, axis, axis, indexing='ij')
+    return np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+
+
+def _half_diagonal(bits: int) -> float:
+    """Largest distance from a cell center to a pixel value inside the cell."""
+    return math.sqrt(3) * ((1 << (8 - bits)) - 1) / 2.0
+
+
+_lock = threading.Lock()
+_cache: Dict[tuple, PaletteClassifier] = {}
+
+
+def palette_classifier(palette: Dict[str, Tuple[int, int, int]], confidence: float,
+                       bits: int = 5) -> PaletteClassifier:
+    """Cached classifier for a {label: rgb} palette at a given confidence (see module notes)."""
+    key = ('palette', tuple((n, tuple(c)) for n, c in palette.items()), float(confidence), bits)
+    with _lock:
+        clf = _cache.get(key)
+        if clf is None:
+            clf = _cache[key] = PaletteClassifier.from_palette(palette, confidence, bits)
+            logger.debug(f"Built palette classifier {list(palette)} (confidence {confidence}, {bits} bits)")
+        return clf
+
+
+def rule_classifier(rules: Sequence[Tuple[str, Rule]], bits: int = 5) -> PaletteClassifier:
+    """Cached classifier for threshold rules (see PaletteClassifier.from_rules)."""
+    key = ('rules', tuple(rules), bits)
+    with _lock:
+        clf = _cache.get(key)
+        if clf is None:
+            clf = _cache[key] = PaletteClassifier.from_rules(rules, bits)
+            logger.debug(f"Built rule classifier {[label for label, _ in rules]} ({bits} bits)")
+        return clf
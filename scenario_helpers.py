@@ -1,7 +1,7 @@
 from typing import Optional
 from logger import logger
 from config import Settings
-from states import MAIN_MENU, wait_state
+from states import MAIN_MENU, UNKNOWN, classify, wait_state
 
 
 def recover_to_main_menu(window, max_attempts: int = 3) -> bool:
@@ -11,15 +11,22 @@ def recover_to_main_menu(window, max_attempts: int = 3) -> bool:
     change scenario logic; call this when a step times out to try returning to a known state.
     """
     logger.info("Attempting to recover to main menu...")
+    current = classify(window)
+    if current.state == MAIN_MENU:
+        logger.info("Already at main menu.")
+        return True
+    if current.state == UNKNOWN:
+        logger.debug(f"Recovering from unknown screen, state scores={current.scores}")
+    else:
+        logger.debug(f"Recovering from {current.state}")
 
     # Try pressing ESC/back a few times to close modals/popups (if emulator forwards it)
     try:
-        import pyautogui as pg
         for _ in range(max_attempts):
             if wait_state(window, MAIN_MENU, timeout=1.0):
                 logger.info("Already at main menu.")
                 return True
-            pg.press('esc')
+            window.press_key('esc')
     except Exception:
         pass
 
@@ -1,13 +1,36 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 from config import Settings
+from palette import palette_classifier, rule_classifier
 from utils import ark_window
-from states import get_state_indicator_element_name, STORE_PANEL, CREDIT_STORE_PANEL
+from states import (MAIN_MENU, UNKNOWN, STORE_PANEL, CREDIT_STORE_PANEL,
+                    RECRUITMENT_PANEL, BASE_PANEL, MISSIONS_PANEL, FRIENDS_PANEL, TERMINAL_PANEL)
+from waits import Wait
+from ledger import DailyLedger
+from checkpoint import CheckpointStore
 from elements import get_element
-from time import sleep
+import time
 from logger import logger
+@dataclass
+class RecruitSnapshot:
+    """Recruitment slots read from one frame (see DailyRecruits.snapshot)."""
+    slots: Dict[int, str]  # 'no_recruitment', 'recruitment_in_progress' or 'recruitment_done'
+    on_panel: bool  # recruitment screen indicator visible
+
+
 class DailyRecruits:
     """
     This class automates the daily recruitment process in Arknights.
     """
+    OPERATOR_TAGS = ['top_operator_tag', 'senior_operator_tag']
+    # Plan actions and the slot status each one needs
+    ACTIONS = {
+        'hire': 'no_recruitment',
+        'expedite': 'recruitment_in_progress',
+        'collect': 'recruitment_done',
+    }
     
     def __init__(self, use_expedite=False, finish_on_recruitment=True):
         self.use_expedite = use_expedite
@@ -41,13 +64,28 @@ class DailyRecruits:
         ark_window.tap('recruit_refresh_confirm')
         ark_window.wait_gone('recruit_refresh_confirm', timeout=5)
 
+    def operator_tags(self):
+        """Names of the guaranteed-rarity tags (Senior/Top Operator) shown in the tag area.
+
+        Both templates are matched against the tag area of one frame in a single pass.
+        """
+        found = ark_window.find_templates(self.OPERATOR_TAGS)
+        tags = [name for name, match in found.items() if match is not None]
+        for name in tags:
+            logger.info(f"Recruitment tag detected: {name} (score {found[name].score:.2f})")
+        return tags
+
     def rare_option_available(self):
-        """Check the recruitment tag rows; non-(49,49,49) indicates rare."""
-        for i in range(1, 6):
-            recruitment_tag_element = get_element(f'recruitment_tag_{i}')
-            recruitment_tag_coords = recruitment_tag_element.click_coords
-            recruitment_tag_common_color = recruitment_tag_element.pixel_points[0][2]
-            if not ark_window.check_color_at(*recruitment_tag_coords, recruitment_tag_common_color, confidence=1):
+        """Check the recruitment tags: Senior/Top Operator templates, then non-(49,49,49) tag rows."""
+        if self.operator_tags():
+            return True
+        tags = [get_element(f'recruitment_tag_{i}') for i in range(1, 6)]
+        xs, ys = zip(*(tag.click_coords for tag in tags))
+        # All five tags from one frame; common tags are exactly the tag color
+        common = palette_classifier({"common": tags[0].pixel_points[0][2]}, 1.0)
+        labels = common.classify(ark_window.sample_colors(xs, ys))
+        for i, label in enumerate(labels, start=1):
+            if label is None:
                 logger.debug(f"Recruitment option {i} is rare")
                 return True
             logger.debug(f"Recruitment option {i} is common")
@@ -79,32 +117,103 @@ class DailyRecruits:
             timeout=20,
         )
 
-    def check_tile(self, i):
-        """Check the status of the hiring tile."""        
-        logger.debug(f"Checking tile status for tile {i}")
-        tile_center_element_name = f"recruitment_tile_{i}"
-        tile_center_coords = get_element(tile_center_element_name).click_coords
-        is_plus = ark_window.check_color_at(*tile_center_coords, (255, 255, 255), confidence=1)
-
+    def snapshot(self, slots=range(1, 5), fresh: bool = True) -> 'RecruitSnapshot':
+        """
+        Read the status of the given slots and whether the recruitment panel is shown, from one frame.
+        """
         # There are only 3 states in which recruitment can be:
         # 1. No recruitment in progress (plus sign)
         # 2. Recruitment in progress (recruitment permit is on the screen)
         # 3. Recruitment done (Any other color in place of recruitment permit)
-        if is_plus:
-            logger.debug(f"Tile {i} status: no_recruitment")
-            return 'no_recruitment'
-        else:
-            permit_element_name = f"recruitment_permit_{i}"
-            permit_coords = get_element(permit_element_name).click_coords
-            recruitment_in_progress = ark_window.check_color_at(*permit_coords, (255, 255, 255), confidence=1)
-
-            if recruitment_in_progress:
-                logger.debug(f"Tile {i} status: recruitment_in_progress")
-                return 'recruitment_in_progress'
+        slots = list(slots)
+        points = [get_element('recruitment_indicator').pixel_points[0][:2]]
+        for i in slots:
+            points.append(get_element(f"recruitment_tile_{i}").click_coords)
+            points.append(get_element(f"recruitment_permit_{i}").click_coords)
+        xs, ys = zip(*points)
+        frame = ark_window.get_native_frame(fresh=fresh)
+        white = palette_classifier({"white": (255, 255, 255)}, 1.0)
+        is_white = [label is not None for label in white.classify(ark_window.sample_colors(xs, ys, frame=frame))]
+        statuses = {}
+        for k, i in enumerate(slots):
+            is_plus, recruitment_in_progress = is_white[1 + 2 * k], is_white[2 + 2 * k]
+            if is_plus:
+                statuses[i] = 'no_recruitment'
+            elif recruitment_in_progress:
+                statuses[i] = 'recruitment_in_progress'
             else:
-                logger.debug(f"Tile {i} status: recruitment_done")
-                return 'recruitment_done'
-        
+                statuses[i] = 'recruitment_done'
+        snap = RecruitSnapshot(slots=statuses, on_panel=is_white[0])
+        logger.debug(f"Recruitment snapshot: {snap}")
+        return snap
+
+    def check_tile(self, i):
+        """Check the status of the hiring tile."""
+        return self.snapshot([i]).slots[i]
+
+    def plan(self, snap: 'RecruitSnapshot') -> List[Tuple[str, int]]:
+        """
+        Full action list for a snapshot: (action, slot) with action in ACTIONS, slots in order.
+        """
+        actions = []
+        for i, status in snap.slots.items():
+            if status == 'no_recruitment':
+                actions.append(('hire', i))
+            elif status == 'recruitment_in_progress':
+                if not self.use_expedite:
+                    logger.info(f"Recruitment in progress for tile {i}. Skipping expedite.")
+                    continue
+                actions += [('expedite', i), ('collect', i)]
+                if self.finish_on_recruitment:
+                    actions.append(('hire', i))
+            elif status == 'recruitment_done':
+                actions += [('collect', i), ('hire', i)]
+        return actions
+
+    def _hire(self, i):
+        """Open an empty slot and start a recruitment, unless a rare tag is offered."""
+        self._click_recruitment_tile(i)
+        if self.rare_option_available():
+            logger.info(f"Rare recruitment option available for tile {i}")
+            ark_window.tap('recruit_close_panel_button')
+            ark_window.wait_gone('recruitment_panel_indicator', timeout=5)
+            return
+        self._confirm_recruitment(i)
+
+    def _collect(self, i):
+        """Hire the finished recruit and skip the animation."""
+        self._click_hiring_tile(i)
+        self._skip_button()
+
+    def _wait_slot(self, i, status, timeout=None) -> bool:
+        """Wait until slot i reads as `status` (the slot alone is re-read each poll)."""
+        waiter = Wait(timeout=timeout or Settings.timeouts.short_timeout, name=f"recruit_slot_{i}:{status}",
+                      abort_check=ark_window.should_abort, frame_source=ark_window)
+        return waiter.until(lambda: self.snapshot([i], fresh=False).slots[i] == status)
+
+    def run_plan(self, actions: List[Tuple[str, int]]):
+        """
+        Execute a plan. Before acting on a slot an earlier action changed, only that
+        slot is read again; if it is not in the state the action needs, the rest of
+        that slot's actions are dropped.
+        """
+        touched, failed = set(), set()
+        for action, i in actions:
+            if i in failed:
+                continue
+            if i in touched and not self._wait_slot(i, self.ACTIONS[action]):
+                logger.warning(f"Tile {i} is not {self.ACTIONS[action]} before '{action}'; skipping the rest of its plan")
+                failed.add(i)
+                continue
+            logger.info(f"Tile {i}: {action}")
+            if action == 'hire':
+                self._hire(i)
+            elif action == 'expedite':
+                self._do_expedite(i)
+            elif action == 'collect':
+                self._collect(i)
+            touched.add(i)
+
     def _confirm_recruitment(self, i):
         """Confirm recruitment by setting time to 9h and confirming."""
         logger.debug(f"Confirming recruitment for tile {i}")
@@ -131,46 +240,32 @@ class DailyRecruits:
             self._click_recruitment_tile(i)
             self._confirm_recruitment(i)
 
+    # Base-coords (x, y, w, h) around the four slot cards (tiles and permits)
+    SLOTS_REGION = (320, 375, 1175, 565)
+    
     def do_daily_recruits(self, use_expedite: bool = None):
+        """
+        Main method to execute the daily recruitment scenario based on chosen mode.
+        Returns the executed plan, or None if the recruitment panel never showed.
+        """
         if use_expedite is not None:
             self.use_expedite = use_expedite
-        """Main method to execute the daily recruitment scenario based on chosen mode."""
-        for i in range(1, 5):
-            sleep(1)
-            tile_status = self.check_tile(i)
-            logger.info(f"Tile {i} status: {tile_status} in main loop")
-            if tile_status == 'no_recruitment':
-                self._click_recruitment_tile(i)
-                
-                if self.rare_option_available():
-                    logger.info(f"Rare recruitment option available for tile {i}")
-                    ark_window.tap('recruit_close_panel_button')
-                    ark_window.wait_gone('recruitment_panel_indicator', timeout=5)
-                    continue
-                
-                self._confirm_recruitment(i)
-            elif tile_status == 'recruitment_in_progress':
-                if not self.use_expedite:
-                    logger.info(f"Recruitment in progress for tile {i}. Skipping expedite.")
-                    continue
-                self._do_expedite(i)
-                self._click_hiring_tile(i)
-                self._skip_button()
-                
-                if self.finish_on_recruitment:
-                    self._click_recruitment_tile(i)
-                    
-                    if self.rare_option_available():
-                        logger.info(f"Rare recruitment option available for tile {i}")
-                        ark_window.tap('recruit_close_panel_button')
-                        ark_window.wait_gone('recruitment_panel_indicator', timeout=5)
-                        continue
-                    
-                    logger.info(f"Finish on recruitment: final cycle for tile {i}")
-                    self._confirm_recruitment(i)
-            elif tile_status == 'recruitment_done':
-                self._click_hiring_tile(i)
-                self._skip_button()
+        if not ark_window.wait_state(RECRUITMENT_PANEL):
+            logger.error("Recruitment panel not shown; not planning from another screen")
+            return None
+        # The slot cards render after the panel indicator; plan from the settled panel
+        ark_window.wait_until_stable(region=self.SLOTS_REGION, timeout=3)
+        snap = self.snapshot()
+        if not snap.on_panel:
+            # Any non-white slot pixel reads as 'recruitment_done'; never act on such a read
+            logger.error("Recruitment panel left before the snapshot; not planning")
+            return None
+        for i, status in snap.slots.items():
+            logger.info(f"Tile {i} status: {status}")
+        actions = self.plan(snap)
+        logger.info(f"Recruitment plan: {actions or 'nothing to do'}")
+        self.run_plan(actions)
+        return actions
 
 class MainMenu:
     """
@@ -182,45 +277,73 @@ class MainMenu:
 
     def return_to_main_menu(self, max_presses=6):
         """
-        Press back until:
-        - back_button disappears, and
-        - main menu confirms appear.
+        Route back to the main menu over the navigation graph (back button from
+        panels and unknown screens), then confirm the main menu is shown.
         """
-        for _ in range(max_presses):
-            if self.is_main_menu_visible():
-                return True
-            # Either press keyboard back/esc or tap the on-screen back button if you prefer
-            ark_window.click(*get_element('back_button').click_coords)
-            ark_window.wait_gone("back_button", timeout=0.1)
-            if ark_window.wait_visible("main_menu_indicators", timeout=0.25):
-                return True
+        if ark_window.navigate(MAIN_MENU, max_taps=max_presses):
+            return True
         # Final check
         return ark_window.wait_visible("main_menu_indicators", timeout=5.0)
 
-    def navigate_to(self, tile_name: str, target_state: str, retries: int = 21, wait_visible_after_click: bool = True, post_click_timeout: float = 0.1):
+    def navigate_to(self, target_state: str, max_taps: int = 12):
         """
-        Click a tile, confirm we arrived with target_state, retry after recovery if needed.
+        Go to target_state by the shortest route from the current screen (see states.navigate).
         """
-        for attempt in range(retries + 1):
-            
-            ark_window.safe_click(get_element(tile_name).click_coords, expect_visible=None)
-            
-            if wait_visible_after_click:
-                indicator_name = get_state_indicator_element_name(target_state)
-                if indicator_name:
-                    ark_window.wait_visible(indicator_name, timeout=post_click_timeout)
-            
-            if ark_window.wait_state(target_state, timeout=Settings.timeouts.default_timeout):
-                return True
-            
-            # Didn't arrive; recover and retry
-            self.return_to_main_menu()
-        
-        return False
+        return ark_window.navigate(target_state, max_taps=max_taps)
+
 class Base:
     """
     This class automates the base process in Arknights.
     """
+    NOTIFICATION_RULES = (
+        # Emergency (red button): red < 190 and blue > 200 -> notification is upper
+        ('upper', lambda r, g, b: (r < 190) & (b > 200)),
+        # Normal notification: red > 190 and blue < 190 -> notification is lower
+        ('lower', lambda r, g, b: (r > 190) & (b < 190)),
+    )
+    
+    # The notification button slides in this long after the base opens, at most;
+    # only a base showing no button for longer has nothing to collect
+    NOTIFICATION_GRACE_S = 2.5
+    
+    def _read_notification_position(self) -> Optional[str]:
+        """'upper', 'lower' or None from the current frame, without logging."""
+        color = ark_window.get_pixel_color(*get_element("notification_color_check").click_coords)
+        return rule_classifier(self.NOTIFICATION_RULES).classify_one(color)
+    
+    def wait_for_notification(self, timeout: float = 10) -> Optional[str]:
+        """
+        Wait until the base shows its notification button ('upper'/'lower') or has
+        shown none for NOTIFICATION_GRACE_S since it loaded ('none').
+        Returns None if neither was confirmed within the timeout.
+        """
+        result = {}
+        empty_since = [None]
+        
+        def notification_present() -> bool:
+            position = self._read_notification_position()
+            if position is not None:
+                result['position'] = position
+            return position is not None
+        
+        def nothing_to_collect() -> bool:
+            # Only a loaded base with an empty notification slot counts, and only once it stays empty
+            if not ark_window.is_visible('base_indicator') or self._read_notification_position() is not None:
+                empty_since[0] = None
+                return False
+            now = time.monotonic()
+            if empty_since[0] is None:
+                empty_since[0] = now
+            if now - empty_since[0] < self.NOTIFICATION_GRACE_S:
+                return False
+            result.setdefault('position', 'none')
+            return True
+        
+        waiter = Wait(timeout=timeout, name="base_notification",
+                      abort_check=ark_window.should_abort, frame_source=ark_window)
+        if not waiter.until_any([notification_present, nothing_to_collect]):
+            return None
+        return result['position']
     
     def _detect_notification_position(self):
         """
@@ -229,16 +352,14 @@ class Base:
         """
         check_coords = get_element("notification_color_check").click_coords
         color = ark_window.get_pixel_color(*check_coords)
-        red, green, blue = color
         
         logger.debug(f"Notification color check at {check_coords}: RGB={color}")
         
-        # Check for emergency (red button): red < 190 and blue > 200 -> notification is upper
-        if red < 190 and blue > 200:
+        position = rule_classifier(self.NOTIFICATION_RULES).classify_one(color)
+        if position == 'upper':
             logger.info("Emergency detected, notification is in upper position")
             return 'upper'
-        # Check for normal notification: red > 190 and blue < 190 -> notification is lower
-        elif red > 190 and blue < 190:
+        elif position == 'lower':
             logger.info("Normal state, notification is in lower position") 
             return 'lower'
         else:
@@ -276,8 +397,9 @@ class Base:
         click_coords = (270, 1000)
         
         for _ in range(8):
-            ark_window.click(*click_coords)
-            sleep(1)
+            clicked = ark_window.click(*click_coords)
+            # Operators keep moving around the base; only watch the tile column
+            ark_window.wait_until_stable(region=(0, 120, 560, 960), timeout=3, not_before=clicked)
 
 class TaskAggregator:
 	"""
@@ -311,118 +433,209 @@ class TaskAggregator:
 		self.orundum_location = ak.orundum_location if orundum_location is None else orundum_location
 		self.store_based_on = list(ak.store_based_on) if store_based_on is None else store_based_on
 		self.store_rarity_priority = list(ak.store_rarity_priority) if store_rarity_priority is None else store_rarity_priority
+		self.store = Store()
+		self.ledger = DailyLedger()
+		# What the running task saw; stored with its ledger entry
+		self.observed = {}
+		self.checkpoints = CheckpointStore()
+		self._task_key = None  # ledger key of the task run_all_dailies is running
+		self._resume = None  # checkpoint the running task continues from
 		logger.info("TaskAggregator initialized")
 	
-	def run_base_dailies(self):
+	def _checkpoint(self, step: str, state: str = UNKNOWN, **counters):
+		"""Record a completed sub-step of the running task (only within run_all_dailies)."""
+		if self._task_key is not None:
+			self.checkpoints.save(self._task_key, step, state, **counters)
+	
+	def _resumed(self, step: str) -> bool:
+		"""Whether the checkpoint being resumed already completed this step of the running task."""
+		return self._resume is not None and step in self._resume.steps
+	
+	def _resumed_counter(self, name: str) -> int:
+		return self._resume.counters.get(name, 0) if self._resume is not None else 0
+	
+	def run_base_dailies(self, return_to_menu: bool = True):
 		"""Execute base daily tasks."""
 		logger.info("Starting base dailies...")
 		# Navigate to base
-		if not self.main_menu.navigate_to('tile_base', 'base_panel'):
+		if not self.main_menu.navigate_to(BASE_PANEL):
 			logger.error("Failed to navigate to base")
 			return False
+		self._checkpoint('navigated', BASE_PANEL)
 		
-		# Execute base tasks
-		sleep(7)
+		# Execute base tasks once the notification button (or its confirmed absence) shows
+		notification = self.base.wait_for_notification(timeout=10)
+		if notification is None:
+			# Not recorded in the ledger: an unconfirmed read must not skip the base for the day
+			logger.error("Base notification state could not be confirmed")
+			return False
 		# self.base.click_base_factory_tiles()
 		# sleep(3)
-		if self.base.open_notification():
+		if notification == 'none':
+			self.observed['already_completed'] = True
+			logger.info("Base dailies already completed")
+		elif self.base.open_notification():
+			self._checkpoint('notification_opened')
 			self.base.click_notification_tiles()
+			self._checkpoint('tiles_clicked')
 			self.base.close_notification()
+			self._checkpoint('notification_closed', BASE_PANEL)
+			self.observed['already_completed'] = False
 			logger.info("Base dailies completed")
 		else:
-			logger.info("Base dailies already completed")
+			logger.error("Failed to open the base notification")
+			return False
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 	
-	def run_recruitment_dailies(self):
+	def run_recruitment_dailies(self, return_to_menu: bool = True):
 		"""Execute recruitment daily tasks."""
 		logger.info("Starting recruitment dailies...")
 		# Navigate to recruitment
-		if not self.main_menu.navigate_to('tile_recruit', 'recruitment_panel'):
+		if not self.main_menu.navigate_to(RECRUITMENT_PANEL):
 			logger.error("Failed to navigate to recruitment")
 			return False
+		self._checkpoint('navigated', RECRUITMENT_PANEL)
 		
-		# Execute recruitment tasks
-		self.daily_recruits.do_daily_recruits(use_expedite=self.use_expedite)
-		self.daily_recruits.do_daily_recruits(use_expedite=False)
+		# Execute recruitment tasks; a resumed run re-plans from the slots as they are now
+		actions = self.daily_recruits.do_daily_recruits(use_expedite=self.use_expedite)
+		if actions is None:
+			return False
+		self.observed['plan'] = [list(action) for action in actions]
+		self._checkpoint('recruited', RECRUITMENT_PANEL, actions=len(actions))
 		logger.info("Recruitment dailies completed")
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 	
-	def run_missions_dailies(self):
+	def run_missions_dailies(self, return_to_menu: bool = True):
 		"""Execute missions daily tasks."""
 		logger.info("Starting missions dailies...")
 		# Navigate to missions
-		if not self.main_menu.navigate_to('tile_missions', 'missions_panel'):
+		if not self.main_menu.navigate_to(MISSIONS_PANEL):
 			logger.error("Failed to navigate to missions")
 			return False
-		sleep(1)
+		self._checkpoint('navigated', MISSIONS_PANEL)
+		# The task list slides in; wait for the collect-all button row to settle
+		ark_window.wait_until_stable(region=(1380, 150, 500, 120), timeout=3)
 		# Execute missions tasks
-		self.missions.collect_all_rewards()
+		if not self._resumed('daily_collected'):
+			self.missions.collect_daily_rewards()
+			self._checkpoint('daily_collected', MISSIONS_PANEL)
+		if not self._resumed('weekly_collected'):
+			self.missions.collect_weekly_rewards()
+			self._checkpoint('weekly_collected', MISSIONS_PANEL)
 		logger.info("Missions dailies completed")
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 	
-	def run_friends_dailies(self):
+	def run_friends_dailies(self, return_to_menu: bool = True):
 		"""Execute friends daily tasks."""
 		logger.info("Starting friends dailies...")
 		# Navigate to friends
-		if not self.main_menu.navigate_to('tile_friends', 'friends_panel'):
+		if not self.main_menu.navigate_to(FRIENDS_PANEL):
 			logger.error("Failed to navigate to friends")
 			return False
+		self._checkpoint('navigated', FRIENDS_PANEL)
 		
-		# Execute friends tasks
-		self.friends.open_friends()
-		self.friends.click_next_button()
-		self.friends.exit_friends()
+		# Execute friends tasks; a resumed run only credits the friends still left
+		visited = self._resumed_counter('visited')
+		if visited < Friends.VISITS:
+			self.friends.open_friends()
+			self._checkpoint('opened')
+			if visited:
+				# open_friends starts over at the first friend of the (stably ordered) list;
+				# step past the bases visited before the restart so the count lines up again
+				logger.info(f"Stepping past the {visited} friend base(s) visited before the restart")
+				self.friends.click_next_button(visits=visited)
+			self.friends.click_next_button(
+				visits=Friends.VISITS - visited,
+				on_visit=lambda n: self._checkpoint('visiting', visited=visited + n),
+			)
+			self.friends.exit_friends()
+		self._checkpoint('exited', FRIENDS_PANEL)
 		logger.info("Friends dailies completed")
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 	
-	def run_terminal_dailies(self):
+	def run_terminal_dailies(self, return_to_menu: bool = True):
 		"""Execute terminal daily tasks."""
 		logger.info("Starting terminal dailies...")
 		# Navigate to terminal
-		if not self.main_menu.navigate_to('tile_terminal', 'terminal_panel', post_click_timeout=2):
+		if not self.main_menu.navigate_to(TERMINAL_PANEL):
 			logger.error("Failed to navigate to terminal")
 			return False
+		self._checkpoint('navigated', TERMINAL_PANEL)
 		# Execute terminal tasks
-		self.terminal.open_orundum_switch()
-		self.terminal.open_location(self.orundum_location)
-		self.terminal.run_simulation(use_total_proxy=self.use_total_proxy)
+		if self._resumed('simulation_done'):
+			logger.info("Simulation already ran before the restart; not starting another")
+		else:
+			self.terminal.open_orundum_switch()
+			self.terminal.open_location(self.orundum_location)
+			self._checkpoint('location_opened')
+			self.observed['simulation'] = self.terminal.run_simulation(use_total_proxy=self.use_total_proxy)
+			if self.observed['simulation'] == 'battle_not_started':
+				logger.error("Terminal simulation did not start")
+				return False
+			self._checkpoint('simulation_done', simulations=self._resumed_counter('simulations') + 1)
 		logger.info("Terminal dailies completed")
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 	
-	def run_all_dailies(self):
-		"""Execute all daily tasks in sequence."""
+	def run_all_dailies(self, resume: bool = False):
+		"""Execute all daily tasks in sequence.
+		
+		resume: continue from the last checkpoint (same account and server day),
+		skipping the tasks before it and the completed steps of its task.
+		"""
 		logger.info("Starting all daily tasks...")
 		
+		# (ledger key, name, task); Missions runs again after Terminal to collect its rewards
 		tasks = [
-			("Recruitment", self.run_recruitment_dailies),
-			("Base", self.run_base_dailies),
-			("Friends", self.run_friends_dailies),
-			("Store", self.run_store_tasks),
-			("Missions", self.run_missions_dailies),
-			("Terminal", self.run_terminal_dailies),
-			("Missions", self.run_missions_dailies),
+			("recruitment", "Recruitment", self.run_recruitment_dailies),
+			("base", "Base", self.run_base_dailies),
+			("friends", "Friends", self.run_friends_dailies),
+			("store", "Store", self.run_store_tasks),
+			("missions", "Missions", self.run_missions_dailies),
+			("terminal", "Terminal", self.run_terminal_dailies),
+			("missions_after_terminal", "Missions", self.run_missions_dailies),
 		]
+		completed = self.ledger.completed() if Settings.arknights.skip_completed_dailies else {}
+		start, checkpoint = 0, None
+		if resume:
+			checkpoint = self.checkpoints.load()
+			keys = [key for key, _, _ in tasks]
+			if checkpoint is None or checkpoint.task not in keys:
+				logger.info("No checkpoint to resume from; running all tasks")
+				checkpoint = None
+			else:
+				start = keys.index(checkpoint.task)
+				# No screen check here: the task navigates to its own panel from wherever the
+				# restart left the game, then skips the steps it already completed
+				logger.info(f"Resuming at {checkpoint.task}, steps done: {checkpoint.steps}, counters: {checkpoint.counters}")
 		
-		for task_name, task_func in tasks:
+		# Tasks go straight from one panel to the next; the main menu is only a hop on the route
+		for index, (key, task_name, task_func) in enumerate(tasks[start:], start=start):
+			if key in completed:
+				logger.info(f"Skipping {task_name} tasks: already done today at {completed[key]['done_at']}")
+				continue
+			self._task_key = key
+			self._resume = checkpoint if checkpoint is not None and index == start else None
 			try:
 				logger.info(f"Executing {task_name} tasks...")
-				success = task_func()
+				self.observed = {}
+				success = task_func(return_to_menu=False)
 				if success:
+					self.ledger.record(key, **self.observed)
 					logger.info(f"{task_name} tasks completed successfully")
 				else:
 					logger.warning(f"{task_name} tasks failed")
@@ -430,31 +643,39 @@ class TaskAggregator:
 				logger.error(f"Error during {task_name} tasks: {e}")
 				# Try to recover to main menu
 				self.main_menu.return_to_main_menu()
+			finally:
+				self._task_key = self._resume = None
 		
+		self.checkpoints.clear()
+		self.main_menu.return_to_main_menu()
 		logger.info("All daily tasks completed")
 		
-	def run_store_tasks(self):
+	def run_store_tasks(self, return_to_menu: bool = True):
 		"""Execute store tasks: navigate, claim, and buy according to priorities."""
 		logger.info("Starting store dailies...")
 		# Navigate to store
-		if not self.main_menu.navigate_to('tile_store', STORE_PANEL):
+		if not self.main_menu.navigate_to(STORE_PANEL):
 			logger.error("Failed to navigate to store")
 			return False
 		self.store.open_credit_store()
+		self._checkpoint('credit_store_opened', CREDIT_STORE_PANEL)
 		
 		# Claim available freebies if present
-		self.store.click_claim_button()
+		if not self._resumed('claimed'):
+			self.store.click_claim_button()
+			self._checkpoint('claimed', CREDIT_STORE_PANEL)
 		
-		# Buy tiles by priority (rarity then discount)
+		# Buy tiles by priority (rarity then discount); sold-out tiles drop out of the snapshot
 		result = self.store.buy_all_tiles(based_on=self.store_based_on, rarity_priority=self.store_rarity_priority)
+		self.observed['result'] = result
+		self._checkpoint('bought', CREDIT_STORE_PANEL)
 		if result == 'insufficient_credit':
-			logger.info("Stopping store tasks due to insufficient credit; returning to main menu")
-			self.main_menu.return_to_main_menu()
-			return True
+			logger.info("Stopping store tasks due to insufficient credit")
+		else:
+			logger.info("Store dailies completed")
 		
-		# Return to main menu
-		self.main_menu.return_to_main_menu()
-		logger.info("Store dailies completed")
+		if return_to_menu:
+			self.main_menu.return_to_main_menu()
 		return True
 
 class Missions:
@@ -492,6 +713,7 @@ class Friends:
     """
     This class automates the friends process in Arknights.
     """
+    VISITS = 10  # friend bases visited per day
     
     def __init__(self):
         pass
@@ -502,22 +724,24 @@ class Friends:
         friend_menu_color = get_element('friends_menu').pixel_points[0][2]
         ark_window.click_and_wait(friend_menu_coords, friend_menu_coords, friend_menu_color, mode='disappear', timeout=5)
         friend_tile_coords = get_element('friend_tile').click_coords
-        sleep(2)
+        # Friend tiles slide in from the right; wait for the first one to settle
+        ark_window.wait_until_stable(region=(1300, 180, 620, 160), timeout=5)
         ark_window.spam_click_until_color(friend_tile_coords, friend_menu_coords, (49, 49, 49), mode='disappear', timeout=15, click_delay=0.7)
         wait_coords = (1645, 68)
         wait_color = (111, 37, 0)
         ark_window.wait_for_color_change(wait_coords, wait_color, mode='appear', timeout=17)
     
-    def click_next_button(self):
-        """Click the next button."""
+    def click_next_button(self, visits: int = VISITS, on_visit=None):
+        """Click the next button `visits` times; on_visit(n) is called after the n-th visit."""
         next_button_coords = get_element('next_button').click_coords
         wait_color = get_element('next_button').pixel_points[0][2]
         wait_coords = (1645, 68)
         
-        for _ in range(10):
+        for n in range(1, visits + 1):
             ark_window.click_and_wait(next_button_coords, wait_coords, wait_color, mode='disappear', timeout=5)
-            sleep(0.5)
             ark_window.wait_for_color_change(wait_coords, wait_color, mode='appear', timeout=15)
+            if on_visit is not None:
+                on_visit(n)
        
     def exit_friends(self):
         """Exit the friends panel."""
@@ -535,6 +759,9 @@ class Terminal:
     """
     This class automates the terminal process in Arknights.
     """
+    # How long a started battle may take to show its HUD; also the fixed wait used
+    # when the HUD is not recognized
+    BATTLE_START_GRACE_S = 15
     
     def __init__(self, amount_orundum: int = 0, amount_sanity: int = 174, orundum_income: int = 330, orundum_cap: int = 1800, sanity_taken: int = 25, use_total_proxy: bool = False):
         self.amount_orundum = amount_orundum
@@ -552,9 +779,9 @@ class Terminal:
         ark_window.click_and_wait(orundum_menu_coords, orundum_menu_coords, orundum_menu_color, mode='disappear', timeout=5)
         
         back_button_coords = get_element('back_button').click_coords
-        sleep(0.5)
-        ark_window.click(*back_button_coords)
-        sleep(1)
+        ark_window.wait_until_stable(region=(0, 0, 600, 110), timeout=3)
+        backed = ark_window.click(*back_button_coords)
+        ark_window.wait_until_stable(region=(1500, 940, 420, 120), timeout=3, not_before=backed)
         orundum_switch_coords = get_element('orundum_location_switch_button').click_coords
         wait_coords = get_element('orundum_current_mission').click_coords
         wait_color = get_element('orundum_current_mission').pixel_points[0][2]
@@ -577,6 +804,19 @@ class Terminal:
         start_button_color = get_element('start_button').pixel_points[0][2]
         ark_window.wait_for_color_change(start_button_coords, start_button_color, mode='appear', timeout=10)
         
+    def _wait_battle_start(self):
+        """
+        Wait for the battle HUD after the squad screen closed.
+        Returns the "battle over" cue for the long wait, or None when the HUD was not
+        recognized (battle_hud is not calibrated on every client); the grace period
+        then served as the fixed start wait and the long wait uses its default cue.
+        """
+        if ark_window.wait_visible('battle_hud', timeout=self.BATTLE_START_GRACE_S):
+            logger.info("Battle started")
+            return ark_window.element_cue('battle_hud', gone=True)
+        logger.warning("Battle HUD not recognized; waiting for the result screen without it")
+        return None
+    
     def _is_auto_deploy_on(self):
         """Check if the auto deploy is on."""
         auto_deploy_coords = get_element('auto_deploy_button').click_coords
@@ -624,7 +864,8 @@ class Terminal:
         else:
             logger.info("Total proxy is not used")
         
-        sleep(0.5)
+        auto_deploy_coords = get_element('auto_deploy_button').click_coords
+        ark_window.wait_until_stable(region=(auto_deploy_coords[0] - 60, auto_deploy_coords[1] - 30, 120, 60), timeout=3)
         if not self._is_auto_deploy_on():
             logger.info("Auto deploy is off, turning it on")
             auto_deploy_coords = get_element('auto_deploy_button').click_coords
@@ -650,7 +891,12 @@ class Terminal:
         # Wait for mission_complete_screen element (verifies all 3 confirmation points)
         if not total_proxy_used:
             final_timeout = 2400
-            sleep(15)
+            # The long wait only starts once the battle is running: the squad screen has
+            # to go and the battle HUD to show, so a fading screen can't end it early
+            if not ark_window.wait_gone('mission_start_button', timeout=15):
+                logger.error("Squad screen did not close, battle not started")
+                return 'battle_not_started'
+            battle_over = self._wait_battle_start()
         else:
             final_timeout = 10
         if total_proxy_used:
@@ -659,7 +905,10 @@ class Terminal:
             else:
                 logger.info("Mission complete screen did not appear")
         else:
-            if ark_window.wait_visible('mission_non_proxy_complete_screen', timeout=final_timeout):
+            # The result screen is a single white pixel, too common to gate on; the
+            # battle HUD going away is the telling change when the HUD was seen
+            if ark_window.wait_visible('mission_non_proxy_complete_screen', timeout=final_timeout, long_wait=True,
+                                       cue=battle_over):
                 logger.info("Mission complete screen appeared")
             else:
                 logger.info("Mission complete screen did not appear")
@@ -714,18 +963,42 @@ class Terminal:
             if status == 'maximum_orundum_reached':
                 logger.info('Maximum orundum reached, returning')
                 return True 
+            if status == 'battle_not_started':
+                return False
             self.amount_orundum += self.orundum_income
             self.amount_sanity -= self.sanity_taken
         
         logger.info(f"Orundum gained: {self.amount_orundum}, Sanity: ~{self.amount_sanity}")
         return True
 
+@dataclass
+class StoreSnapshot:
+    """State of the 10 credit store tiles, read from one frame (see Store.snapshot)."""
+    available: Dict[int, bool]
+    discount: Dict[int, bool]
+    rarity: Dict[int, str]
+
+    def candidates(self) -> List[int]:
+        return [i for i in range(1, 11) if self.available.get(i)]
+
+
 class Store:
     """
     Store screen helpers.
     """
     TILE_W = 355
     TILE_H = 355
+    # Rarity palette (RGB) sampled around the item circle
+    RARITY_PALETTE = {
+        "common_gray": (162, 162, 162),
+        "uncommon_yellow": (220, 229, 53),
+        "rare_blue": (0, 177, 255),
+        "very_rare_pink": (215, 198, 213),
+        "extremely_rare_orange": (255, 200, 0),
+    }
+    RARITY_POINTS = ("circle_position_left", "circle_position_right",
+                     "circle_position_upper", "circle_position_lower")
+    _POINTS = None  # snapshot sample coords, built on first use
     
     def open_credit_store(self):
         """
@@ -794,80 +1067,63 @@ class Store:
         """
         Check if the tile has a discount.
         """
-        discount_position = self._tile_info(tile_number)["discount_position"]["coords"]
-        discount_rgb = self._tile_info(tile_number)["discount_position"]["rgb"]
-        return ark_window.check_color_at(*discount_position, discount_rgb, confidence=1)
+        discount = self._tile_info(tile_number)["discount_position"]
+        return ark_window.check_color_at(*discount["coords"], discount["rgb"], confidence=1)
         
     def is_available(self, tile_number: int):
         """
         Check if the tile is sold out.
         """
-        available_position = self._tile_info(tile_number)["available_position"]["coords"]
-        available_rgb = self._tile_info(tile_number)["available_position"]["rgb"]
-        return ark_window.check_color_at(*available_position, available_rgb, confidence=1)
+        available = self._tile_info(tile_number)["available_position"]
+        return ark_window.check_color_at(*available["coords"], available["rgb"], confidence=1)
         
+    def _snapshot_points(self):
+        """Base coords of every point a snapshot reads, tile-major: available, discount, 4 circle points."""
+        if Store._POINTS is None:
+            keys = ("available_position", "discount_position") + self.RARITY_POINTS
+            xy = [self._tile_info(i)[key]["coords"] for i in range(1, 11) for key in keys]
+            Store._POINTS = np.array(xy, dtype=np.int32)
+        return Store._POINTS
+
+    def snapshot(self, fresh: bool = True) -> 'StoreSnapshot':
+        """
+        Analyse all 10 tiles from a single frame: availability, discount and rarity.
+        All 60 points are read in one gather; rarity comes from the palette lookup
+        table applied to the four circle samples of each tile.
+        """
+        frame = ark_window.get_native_frame(fresh=fresh)
+        points = self._snapshot_points()
+        colors = ark_window.sample_colors(points[:, 0], points[:, 1], frame=frame)
+        colors = colors.reshape(10, 2 + len(self.RARITY_POINTS), 3).astype(np.int32)
+        available = np.all(colors[:, 0] == self._tile_info(1)["available_position"]["rgb"], axis=1)
+        discount = np.all(colors[:, 1] == self._tile_info(1)["discount_position"]["rgb"], axis=1)
+
+        # Most similar circle sample decides (robust to outliers/occlusions); needs >= 0.95
+        rarities = palette_classifier(self.RARITY_PALETTE, 0.95).best_of(colors[:, 2:], default="unknown")
+        rarity = {i + 1: label for i, label in enumerate(rarities)}
+
+        snap = StoreSnapshot(
+            available={i + 1: bool(available[i]) for i in range(10)},
+            discount={i + 1: bool(discount[i]) for i in range(10)},
+            rarity=rarity,
+        )
+        logger.debug(f"Store snapshot: {snap}")
+        return snap
+
     def determine_rarity(self, tile_number: int):
         """
         Determine the rarity of the tile.
         """
-        import math
-        info = self._tile_info(tile_number)
-        sample_points = [
-            info["circle_position_left"]["coords"],
-            info["circle_position_right"]["coords"],
-            info["circle_position_upper"]["coords"],
-            info["circle_position_lower"]["coords"],
-        ]
-        
-        # Rarity palette (BGR noted by user visuals, but we use RGB tuples here)
-        palette = {
-            "common_gray": (162, 162, 162),
-            "uncommon_yellow": (220, 229, 53),
-            "rare_blue": (0, 177, 255),
-            "very_rare_pink": (215, 198, 213),
-            "extremely_rare_orange": (255, 200, 0),
-        }
-        
-        def similarity(a, b):
-            dr = a[0] - b[0]
-            dg = a[1] - b[1]
-            db = a[2] - b[2]
-            dist = math.sqrt(dr * dr + dg * dg + db * db)
-            max_dist = math.sqrt(3 * 255 * 255)
-            return max(0.0, 1.0 - dist / max_dist)
-        
-        # Fetch colors at sample points
-        found = [ark_window.get_pixel_color(x, y) for (x, y) in sample_points]
-        
-        # Score palette by MAX similarity over samples (robust to outliers/occlusions)
-        best_rarity = "unknown"
-        best_sim = -1.0
-        for rarity, target in palette.items():
-            max_sim = 0.0
-            for c in found:
-                s = similarity(c, target)
-                if s > max_sim:
-                    max_sim = s
-            if max_sim > best_sim:
-                best_sim = max_sim
-                best_rarity = rarity
-        
-        # Require strong evidence from at least one point
-        return best_rarity if best_sim >= 0.95 else "unknown"
+        if not (1 <= tile_number <= 10):
+            raise ValueError("tile_number must be in 1..10")
+        return self.snapshot(fresh=False).rarity[tile_number]
         
     def determine_rarities(self):
         """
         Determine rarities for all 10 tiles.
         Returns a dict {tile_number: rarity}
         """
-        results = {}
-        for i in range(1, 11):
-            try:
-                results[i] = self.determine_rarity(i)
-            except Exception as e:
-                logger.info('Error determining rarity for tile %s', i, e)
-                results[i] = "unknown"
-        return results
+        return self.snapshot(fresh=False).rarity
         
     def click_claim_button(self):
         """
@@ -885,12 +1141,13 @@ class Store:
         else:
             logger.info("Claim button is not available")
         
-    def buy_tile(self, tile_number: int):
+    def buy_tile(self, tile_number: int, snapshot: Optional[StoreSnapshot] = None):
         """
-        Buy the tile.
+        Buy the tile. With a snapshot, its availability is trusted instead of re-checked.
         """
         info = self._tile_info(tile_number)
-        if not self.is_available(tile_number):
+        available = snapshot.available.get(tile_number, False) if snapshot else self.is_available(tile_number)
+        if not available:
             logger.info("Tile is not available")
             return False
         tile_coords_available = info["available_position"]["coords"]
@@ -906,7 +1163,9 @@ class Store:
             return 'insufficient_credit'
         
         logger.info(f"Bought tile {tile_number}")
-        sleep(0.25)
+        # Purchase dialog fully closed (returns at once if it already is); the
+        # "items obtained" popup is then dismissed by the clicks below
+        ark_window.wait_gone('buy_button_credit_store', timeout=3)
         
         credit_store_indicator_coords = get_element('credit_store_interface_indicator_bottom').click_coords
         credit_store_indicator_wait_coords = get_element('credit_store_interface_indicator_bottom').pixel_points[0][:2]
@@ -929,11 +1188,11 @@ class Store:
         rarity_rank = {name: idx for idx, name in enumerate(rarity_priority)}
         unknown_rank = len(rarity_priority) + 1
         
-        # Determine rarities for all tiles once
-        rarities = self.determine_rarities()
-        
-        # Consider only tiles that are available
-        candidates = [i for i in range(1, 11) if self.is_available(i)]
+        # Availability, discounts and rarities of all tiles from one frame
+        snap = self.snapshot()
+        candidates = snap.candidates()
+        rarities = snap.rarity
+        discounts = snap.discount
         
         def sort_key(tile_index: int):
             parts = []
@@ -943,7 +1202,7 @@ class Store:
                     parts.append(rarity_rank.get(r, unknown_rank))
                 elif criterion == 'discount':
                     # True (has discount) should be bought earlier → use 0 for True, 1 for False
-                    has_disc = self._has_discount(tile_index)
+                    has_disc = discounts.get(tile_index, False)
                     parts.append(0 if has_disc else 1)
                 elif criterion == 'item':
                     # Not implemented yet; ignore
@@ -957,7 +1216,7 @@ class Store:
         
         bought = []
         for idx in sorted_tiles:
-            status = self.buy_tile(idx)
+            status = self.buy_tile(idx, snapshot=snap)
             if status == 'insufficient_credit':
                 logger.info("Insufficient credit detected during purchase; stopping further store buys")
                 return 'insufficient_credit'
@@ -1,6 +1,10 @@
-from typing import Optional
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from config import Settings
 from elements import get_element
+from logger import logger
 
 
 # Minimal screen state identifiers
@@ -12,6 +16,18 @@ FRIENDS_PANEL = "friends_panel"
 TERMINAL_PANEL = "terminal_panel"
 STORE_PANEL = "store_panel"
 CREDIT_STORE_PANEL = "credit_store_panel"
+UNKNOWN = "unknown"
+
+STATES = (
+    MAIN_MENU,
+    RECRUITMENT_PANEL,
+    BASE_PANEL,
+    MISSIONS_PANEL,
+    FRIENDS_PANEL,
+    TERMINAL_PANEL,
+    STORE_PANEL,
+    CREDIT_STORE_PANEL,
+)
 
 def get_state_indicator_element_name(state_name: str) -> Optional[str]:
     if state_name == MAIN_MENU:
@@ -33,37 +49,181 @@ def get_state_indicator_element_name(state_name: str) -> Optional[str]:
     return None
 
 def is_state(window, state_name: str) -> bool:
-    if state_name == MAIN_MENU:
-        el = get_element("main_menu_indicators")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == RECRUITMENT_PANEL:
-        el = get_element("recruitment_indicator")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == BASE_PANEL:
-        el = get_element("base_indicator")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == MISSIONS_PANEL:
-        el = get_element("missions_indicators")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == FRIENDS_PANEL:
-        el = get_element("friends_indicator")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == TERMINAL_PANEL:
-        el = get_element("terminal_indicator")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == STORE_PANEL:
-        el = get_element("recommended_store_indicator")
-        return window.is_visible(el, log_checks=True) if el else False
-    if state_name == CREDIT_STORE_PANEL:
-        el = get_element("credit_store_interface_indicator_bottom")
-        return window.is_visible(el, log_checks=True) if el else False
-    return False
+    indicator = get_state_indicator_element_name(state_name)
+    el = get_element(indicator) if indicator else None
+    return window.is_visible(el, log_checks=True) if el else False
+
+
+@dataclass(frozen=True)
+class Classification:
+    state: str  # matching state, or UNKNOWN
+    scores: Dict[str, float]  # fraction of each state's indicator points that matched
+
+
+def classify(window, frame=None) -> Classification:
+    """Evaluate every state indicator against one frame in a single vectorized pass.
+
+    A state matches when all of its indicator points match; if several do, the
+    one with more indicator points (the more specific check) wins.
+    """
+    slices = window.element_table().slices
+    states = [st for st in STATES if get_state_indicator_element_name(st) in slices]
+    names = [get_state_indicator_element_name(st) for st in states]
+    passed, _, _ = window.check_elements(names, frame=frame)
+    counts = np.array([slices[n].stop - slices[n].start for n in names])
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    hits = np.add.reduceat(passed.astype(np.int32), offsets) if len(passed) else np.zeros(0)
+    scores = {st: float(h) / int(c) for st, h, c in zip(states, hits, counts)}
+    best = UNKNOWN
+    for st, c in zip(states, counts):
+        if scores[st] >= 1.0 and (best == UNKNOWN or c > counts[states.index(best)]):
+            best = st
+    return Classification(best, scores)
 
 
 def wait_state(window, state_name: str, timeout: Optional[float] = None) -> bool:
     from waits import Wait
     t = Settings.timeouts
-    waiter = Wait(timeout=timeout or t.default_timeout, name=f"wait_state:{state_name}", abort_check=window.should_abort)
-    return waiter.until(lambda: is_state(window, state_name))
+    waiter = Wait(timeout=timeout or t.default_timeout, name=f"wait_state:{state_name}", abort_check=window.should_abort,
+                  frame_source=window)
+    ok = waiter.until(lambda: is_state(window, state_name))
+    if not ok:
+        current = classify(window)
+        logger.debug(f"wait_state:{state_name} failed; screen classified as {current.state} scores={current.scores}")
+    return ok
+
+
+
+
+# --- Navigation graph ---
+# Nodes are the states above; an edge is an element tap and the state it should lead to.
+# Routes are recomputed from the classified screen after every hop, so a tap that
+# lands somewhere unexpected just costs a detour.
+
+@dataclass(frozen=True)
+class Edge:
+    source: str
+    element: str  # element tapped (its click_coords)
+    target: str  # state expected after the tap
+
 
+_MAIN_MENU_TILES = (
+    ("tile_recruit", RECRUITMENT_PANEL),
+    ("tile_base", BASE_PANEL),
+    ("tile_missions", MISSIONS_PANEL),
+    ("tile_friends", FRIENDS_PANEL),
+    ("tile_terminal", TERMINAL_PANEL),
+    ("tile_store", STORE_PANEL),
+)
 
+# Panel-to-panel shortcuts (the in-game home / quick-navigation menu) are not in the
+# graph: that menu has no calibrated elements here, so every route between panels
+# goes through the main menu. Adding its entries as Edge(panel, <entry>, target)
+# for each panel is all shortest_path needs to use them.
+EDGES: Tuple[Edge, ...] = (
+    tuple(Edge(MAIN_MENU, tile, state) for tile, state in _MAIN_MENU_TILES)
+    + (Edge(STORE_PANEL, "credit_store_button", CREDIT_STORE_PANEL),)
+    # The back button returns every panel to the main menu
+    + tuple(Edge(state, "back_button", MAIN_MENU) for state in STATES if state != MAIN_MENU)
+)
+
+
+def shortest_path(source: str, target: str, edges: Tuple[Edge, ...] = EDGES) -> Optional[List[Edge]]:
+    """Fewest-taps route from source to target (BFS), [] if already there, None if unreachable."""
+    if source == target:
+        return []
+    outgoing: Dict[str, List[Edge]] = {}
+    for edge in edges:
+        outgoing.setdefault(edge.source, []).append(edge)
+    previous: Dict[str, Edge] = {}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for edge in outgoing.get(node, ()):
+            if edge.target in previous or edge.target == source:
+                continue
+            previous[edge.target] = edge
+            if edge.target == target:
+                path = [edge]
+                while path[0].source != source:
+                    path.insert(0, previous[path[0].source])
+                return path
+            queue.append(edge.target)
+    return None
+
+
+# Consecutive back taps on screens that stay unrecognized before navigate gives up
+MAX_BACK_OUTS = 3
+
+
+def _indicator_points(window) -> List[Tuple[int, int]]:
+    """Base coords of every state indicator point (the pixels classify reads)."""
+    table = window.element_table()
+    names = [n for n in map(get_state_indicator_element_name, STATES) if n in table.slices]
+    return [(int(x), int(y)) for x, y in table.base_xy[table.rows(names)]]
+
+
+def _settled_classification(window, timeout: float) -> Classification:
+    """Classify once the screen shows a known state or its indicator areas stop changing.
+
+    A screen mid-transition reads as UNKNOWN; only one that has settled that way
+    is really unknown. Only the small areas around the indicator points are
+    compared, so animated backgrounds elsewhere don't hold the wait up.
+    """
+    from waits import Wait
+    t = Settings.timeouts
+    detector = window.change_detector(_indicator_points(window))
+
+    def indicators_still() -> bool:
+        # Runs first in each poll: outside a streamed/pinned frame, grab the frame both predicates read
+        return not detector.changed(window.get_native_frame(fresh=not window.capture_thread_running()))
+
+    def known() -> bool:
+        return classify(window).state != UNKNOWN
+
+    Wait(timeout=timeout, name="navigate:settle", require_stable_frames=2, require_stable_ms=t.settle_ms,
+         abort_check=window.should_abort, frame_source=window).until_any([indicators_still, known])
+    return classify(window, frame=window.get_native_frame(fresh=True))
+
+
+def navigate(window, target: str, max_taps: int = 12, timeout: Optional[float] = None) -> bool:
+    """Walk the navigation graph from the current screen to `target`.
+
+    Each hop classifies the screen, taps the first edge of the shortest route and
+    waits for that edge's target. A settled unknown screen (popup, sub-screen) is
+    backed out of with the back button, at most MAX_BACK_OUTS times in a row.
+    """
+    t = Settings.timeouts
+    back_outs = 0
+    for _ in range(max_taps):
+        if window.should_abort():
+            return False
+        current = classify(window, frame=window.get_native_frame(fresh=True))
+        if current.state == UNKNOWN:
+            current = _settled_classification(window, t.short_timeout)
+        if current.state == target:
+            return True
+        if current.state == UNKNOWN:
+            if back_outs >= MAX_BACK_OUTS:
+                logger.error(f"navigate:{target}: screen still unrecognized after {back_outs} back taps, "
+                             f"stopping (scores={current.scores})")
+                return False
+            back_outs += 1
+            logger.debug(f"navigate:{target}: unknown screen, backing out {back_outs}/{MAX_BACK_OUTS} "
+                         f"(scores={current.scores})")
+            window.safe_click(get_element("back_button").click_coords)
+            continue
+        back_outs = 0
+        path = shortest_path(current.state, target)
+        if path is None:
+            logger.warning(f"navigate: no route from {current.state} to {target}")
+            return False
+        edge = path[0]
+        logger.debug(f"navigate:{target}: {current.state} -> {edge.target} via '{edge.element}' ({len(path)} hop(s) left)")
+        indicator = get_state_indicator_element_name(edge.target)
+        window.safe_click(get_element(edge.element).click_coords, expect_visible=indicator,
+                          timeout=timeout or t.default_timeout)
+    ok = is_state(window, target)
+    if not ok:
+        logger.warning(f"navigate: gave up reaching {target} after {max_taps} taps")
+    return ok
@@ -0,0 +1,220 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from logger import logger
+
+
+# Template matching for UIElements with a template_path. A template is resized
+# by its template_scale (template pixels -> 1920x1080 base pixels) times the
+# window/base scale, so one file serves every window size; resized copies are
+# cached per scale, and the template_scale that matched last is tried first.
+
+_BASE_DIR = os.path.dirname(__file__)
+# Pyramid pre-check runs at half resolution; a coarse score this far below the
+# threshold rejects without a full-resolution match
+_PYRAMID_MARGIN = 0.15
+# Templates smaller than this (px, either side at half resolution) skip the pyramid
+_PYRAMID_MIN_SIDE = 12
+# Search slack (px) around the last match / the coarse pyramid hit
+_LOCAL_SLACK = 6
+
+
+def _cv2():
+    import cv2  # imported lazily: only template elements need OpenCV
+    return cv2
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    x: int  # window-relative top-left of the match
+    y: int
+    width: int
+    height: int
+    score: float
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+@dataclass(frozen=True)
+class ScaledTemplate:
+    gray: np.ndarray  # template at window scale
+    half: Optional[np.ndarray]  # pyrDown of gray, None when too small for the pyramid
+
+
+class TemplateMatcher:
+    """Finds element templates in native BGRA frames.
+
+    - Templates are loaded once and rescaled once per window scale.
+    - Matching is limited to the element's search_roi (base coords), if any.
+    - The last match position (and template scale) of each element is tried
+      first with a tiny search.
+    - Otherwise a half-resolution pass rejects clear misses before the
+      full-resolution match, which then only covers the area around the coarse hit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Optional[np.ndarray]] = {}
+        self._scaled: Dict[Tuple[str, float, float], Optional[ScaledTemplate]] = {}
+        self._last: Dict[str, Tuple[int, int]] = {}
+        self._learned_scale: Dict[str, float] = {}
+
+    def clear(self):
+        with self._lock:
+            self._sources.clear()
+            self._scaled.clear()
+            self._last.clear()
+            self._learned_scale.clear()
+
+    def _source(self, path: str) -> Optional[np.ndarray]:
+        if path not in self._sources:
+            full = path if os.path.isabs(path) else os.path.join(_BASE_DIR, path)
+            img = _cv2().imread(full, _cv2().IMREAD_GRAYSCALE)
+            if img is None:
+                logger.warning(f"Template image not found or unreadable: {full}")
+            self._sources[path] = img
+        return self._sources[path]
+
+    def template(self, path: str, scale_x: float, scale_y: float) -> Optional[ScaledTemplate]:
+        """Grayscale template resized to the window scale (cached per scale)."""
+        key = (path, round(scale_x, 4), round(scale_y, 4))
+        with self._lock:
+            if key in self._scaled:
+                return self._scaled[key]
+            src = self._source(path)
+            scaled = None
+            if src is not None:
+                cv2 = _cv2()
+                w = max(1, int(round(src.shape[1] * scale_x)))
+                h = max(1, int(round(src.shape[0] * scale_y)))
+                gray = src if (w, h) == (src.shape[1], src.shape[0]) else cv2.resize(src, (w, h), interpolation=cv2.INTER_AREA)
+                half = cv2.pyrDown(gray) if min(h, w) >= 2 * _PYRAMID_MIN_SIDE else None
+                scaled = ScaledTemplate(gray, half)
+                logger.debug(f"Template {path} scaled to {w}x{h} (scale {scale_x:.3f}x{scale_y:.3f})")
+            self._scaled[key] = scaled
+            return scaled
+
+    @staticmethod
+    def _best(image: np.ndarray, templ: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        if image.shape[0] < templ.shape[0] or image.shape[1] < templ.shape[1]:
+            return -1.0, (0, 0)
+        cv2 = _cv2()
+        scores = cv2.matchTemplate(image, templ, cv2.TM_CCOEFF_NORMED)
+        # Flat regions/templates give NaN/inf
+        np.nan_to_num(scores, copy=False, nan=-1.0, posinf=-1.0, neginf=-1.0)
+        _, best, _, loc = cv2.minMaxLoc(scores)
+        return float(best), loc
+
+    def _local(self, gray: np.ndarray, templ: np.ndarray, x: int, y: int) -> Tuple[float, Tuple[int, int]]:
+        """Best match with top-left within _LOCAL_SLACK of (x, y) in gray coords."""
+        th, tw = templ.shape
+        x1, y1 = max(0, x - _LOCAL_SLACK), max(0, y - _LOCAL_SLACK)
+        x2 = min(gray.shape[1], x + tw + _LOCAL_SLACK)
+        y2 = min(gray.shape[0], y + th + _LOCAL_SLACK)
+        score, (lx, ly) = self._best(gray[y1:y2, x1:x2], templ)
+        return score, (x1 + lx, y1 + ly)
+
+    def _gray(self, frame: np.ndarray, rect: Tuple[int, int, int, int]) -> np.ndarray:
+        x1, y1, x2, y2 = rect
+        cv2 = _cv2()
+        return cv2.cvtColor(np.ascontiguousarray(frame[y1:y2, x1:x2]), cv2.COLOR_BGRA2GRAY)
+
+    @staticmethod
+    def _clip(frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = roi if roi is not None else (0, 0, w, h)
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def _at_last(self, name: str, tpl: ScaledTemplate, frame: np.ndarray,
+                 rect: Tuple[int, int, int, int], threshold: float) -> Optional[TemplateMatch]:
+        """Re-check the last match position; only the patch around it is converted."""
+        last = self._last.get(name)
+        if last is None:
+            return None
+        x1, y1, x2, y2 = rect
+        th, tw = tpl.gray.shape
+        px1, py1 = max(x1, last[0] - _LOCAL_SLACK), max(y1, last[1] - _LOCAL_SLACK)
+        px2, py2 = min(x2, last[0] + tw + _LOCAL_SLACK), min(y2, last[1] + th + _LOCAL_SLACK)
+        if px2 <= px1 or py2 <= py1:
+            return None
+        score, (mx, my) = self._best(self._gray(frame, (px1, py1, px2, py2)), tpl.gray)
+        if score >= threshold:
+            return self._hit(name, px1 + mx, py1 + my, tw, th, score)
+        return None
+
+    def _search(self, tpl: ScaledTemplate, gray: np.ndarray, half: Optional[np.ndarray],
+                threshold: float) -> Tuple[float, Tuple[int, int]]:
+        """Best match in gray: half-resolution early rejection, then full resolution near the coarse hit."""
+        if tpl.half is not None and half is not None:
+            coarse, (cx, cy) = self._best(half, tpl.half)
+            if coarse < threshold - _PYRAMID_MARGIN:
+                return coarse, (0, 0)
+            return self._local(gray, tpl.gray, 2 * cx, 2 * cy)
+        return self._best(gray, tpl.gray)
+
+    def _scale_order(self, name: str, scales: Sequence[float]) -> List[float]:
+        learned = self._learned_scale.get(name)
+        if learned is None:
+            return list(scales)
+        return [learned] + [s for s in scales if s != learned]
+
+    def match_many(self, requests: Sequence[Tuple[str, str, float, Sequence[float]]], frame: np.ndarray,
+                   scale: Tuple[float, float], roi: Optional[Tuple[int, int, int, int]] = None
+                   ) -> Dict[str, Optional[TemplateMatch]]:
+        """Match several templates against one search area of a native BGRA frame.
+
+        requests: (name, path, threshold, template_scales) per template, where
+        template_scales are candidate factors from template pixels to base
+        pixels (the one that matched last is tried first). scale: window/base
+        scale factors; roi: window-relative (x1, y1, x2, y2), whole frame if None.
+        The area is converted to grayscale (and pyramid-reduced) once for all.
+        """
+        results: Dict[str, Optional[TemplateMatch]] = {name: None for (name, _, _, _) in requests}
+        rect = self._clip(frame, roi)
+        if rect is None:
+            return results
+        pending = []
+        for name, path, threshold, scales in requests:
+            order = self._scale_order(name, scales)
+            tpl = self.template(path, scale[0] * order[0], scale[1] * order[0])
+            hit = self._at_last(name, tpl, frame, rect, threshold) if tpl is not None else None
+            if hit is not None:
+                results[name] = hit
+            else:
+                pending.append((name, path, threshold, order))
+        if not pending:
+            return results
+
+        gray = self._gray(frame, rect)
+        half = _cv2().pyrDown(gray) if min(gray.shape) >= 2 * _PYRAMID_MIN_SIDE else None
+        for name, path, threshold, order in pending:
+            self._last.pop(name, None)
+            for s in order:
+                tpl = self.template(path, scale[0] * s, scale[1] * s)
+                if tpl is None:
+                    break
+                score, (mx, my) = self._search(tpl, gray, half, threshold)
+                if score >= threshold:
+                    th, tw = tpl.gray.shape
+                    self._learned_scale[name] = s
+                    results[name] = self._hit(name, rect[0] + mx, rect[1] + my, tw, th, score)
+                    break
+        return results
+
+    def match(self, name: str, path: str, frame: np.ndarray, threshold: float,
+              scale: Tuple[float, float], roi: Optional[Tuple[int, int, int, int]] = None,
+              template_scales: Sequence[float] = (1.0,)) -> Optional[TemplateMatch]:
+        """Find one template in a native BGRA frame (see match_many)."""
+        return self.match_many([(name, path, threshold, template_scales)], frame, scale, roi)[name]
+
+    def _hit(self, name: str, x: int, y: int, w: int, h: int, score: float) -> TemplateMatch:
+        self._last[name] = (x, y)
+        return TemplateMatch(x, y, w, h, score)
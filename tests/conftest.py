@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import ReplayBackend
+from inputs import RecordingBackend
+
+
+BASE_SIZE = (1080, 1920)
+
+
+def blank_frame(rgb=(0, 0, 0)) -> np.ndarray:
+    """A 1920x1080 RGB frame filled with one color."""
+    frame = np.empty(BASE_SIZE + (3,), dtype=np.uint8)
+    frame[:] = rgb
+    return frame
+
+
+@pytest.fixture
+def replay(tmp_path):
+    """replay(*rgb_frames, fps=None) points ark_window at the given frames and a
+    RecordingBackend; returns (window, recorder)."""
+    from utils import ark_window
+
+    def load(*frames, fps=None):
+        path = str(tmp_path / f"replay_{len(os.listdir(tmp_path))}.npz")
+        np.savez(path, frames=np.stack(frames))
+        recorder = RecordingBackend()
+        ark_window.set_backend(ReplayBackend(path, fps=fps))
+        ark_window.set_input_backend(recorder)
+        return ark_window, recorder
+
+    yield load
+    ark_window.stop_capture_thread()
+    ark_window.stop_click_dispatcher()
+    ark_window.set_abort(False)
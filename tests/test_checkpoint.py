@@ -0,0 +1,50 @@
+import json
+from datetime import timedelta
+
+import checkpoint
+from checkpoint import CheckpointStore
+from ledger import server_day
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    store = CheckpointStore("main", "global", path)
+    store.save("friends", "navigated", "friends_panel")
+    store.save("friends", "visited", "unknown", visits=4)
+    cp = CheckpointStore("main", "global", path).load()
+    assert (cp.task, cp.step, cp.state) == ("friends", "visited", "unknown")
+    assert cp.steps == ["navigated", "visited"]
+    assert cp.counters == {"visits": 4}
+    assert cp.day == server_day("global").isoformat()
+
+
+def test_new_task_starts_a_fresh_checkpoint(tmp_path):
+    store = CheckpointStore("main", "global", str(tmp_path / "checkpoint.json"))
+    store.save("friends", "visited", "unknown", visits=10)
+    cp = store.save("store", "navigated", "store_panel")
+    assert cp.steps == ["navigated"]
+    assert cp.counters == {}
+
+
+def test_load_rejects_other_accounts_old_days_and_bad_files(tmp_path, monkeypatch):
+    path = tmp_path / "checkpoint.json"
+    CheckpointStore("main", "global", str(path)).save("base", "navigated", "base_panel")
+    assert CheckpointStore("alt", "global", str(path)).load() is None
+
+    tomorrow = server_day("global") + timedelta(days=1)
+    monkeypatch.setattr(checkpoint, "server_day", lambda server=None, now=None: tomorrow)
+    assert CheckpointStore("main", "global", str(path)).load() is None
+    monkeypatch.undo()
+
+    path.write_text(json.dumps({"account": "main", "unexpected": 1}))
+    assert CheckpointStore("main", "global", str(path)).load() is None
+
+
+def test_clear_removes_the_file(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    store = CheckpointStore("main", "global", str(path))
+    store.clear()
+    store.save("base", "navigated", "base_panel")
+    store.clear()
+    assert not path.exists()
+    assert store.load() is None
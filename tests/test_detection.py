@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from conftest import blank_frame
+from templates import TemplateMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def template_rgb(name):
+    return np.asarray(Image.open(os.path.join(ROOT, "images", name)).convert("RGB"))
+
+
+def paste(frame, image, x, y):
+    h, w = image.shape[:2]
+    frame[y:y + h, x:x + w] = image
+    return frame
+
+
+def test_find_color_blobs(replay):
+    frame = blank_frame()
+    frame[100:110, 200:230] = (235, 220, 38)  # 300 px
+    frame[500:505, 800:804] = (238, 218, 40)  # 20 px, within tolerance
+    frame[700:702, 50:52] = (235, 220, 38)  # 4 px of noise
+    frame[900:950, 900:950] = (0, 152, 220)
+    window, _ = replay(frame)
+
+    blobs = window.find_color((235, 220, 38), tolerance=5, min_area=10)
+    assert [b.area for b in blobs] == [300, 20]
+    assert blobs[0].bbox == (200, 100, 30, 10)
+    cx, cy = blobs[0].base_center
+    assert abs(cx - 214.5) <= 1 and abs(cy - 104.5) <= 1
+
+    both = window.find_color([(235, 220, 38), (0, 152, 220)], tolerance=5, min_area=10)
+    assert [b.color for b in both] == [(0, 152, 220), (235, 220, 38), (235, 220, 38)]
+
+
+def test_find_color_roi_and_no_match(replay):
+    frame = blank_frame()
+    frame[100:110, 200:230] = (235, 220, 38)
+    frame[600:610, 1200:1230] = (235, 220, 38)
+    window, _ = replay(frame)
+    blobs = window.find_color((235, 220, 38), roi=(1000, 500, 400, 200))
+    assert [b.bbox for b in blobs] == [(1200, 600, 30, 10)]
+    assert window.find_color((1, 2, 3), tolerance=0) == []
+
+
+def test_template_matcher_finds_pasted_template(replay):
+    tag = template_rgb("senior_operator.png")
+    window, _ = replay(paste(blank_frame((40, 40, 40)), tag, 700, 560))
+    frame = window.get_native_frame(fresh=True)
+    matcher = TemplateMatcher()
+    match = matcher.match("senior", "images/senior_operator.png", frame, 0.8, (1.0, 1.0))
+    assert match is not None
+    assert (match.x, match.y) == (700, 560)
+    assert match.score >= 0.95
+
+    window, _ = replay(blank_frame((40, 40, 40)))
+    empty = window.get_native_frame(fresh=True)
+    assert matcher.match("senior", "images/senior_operator.png", empty, 0.8, (1.0, 1.0)) is None
+
+
+def test_find_templates_tells_tags_apart(replay):
+    tag = template_rgb("top_operator.png")
+    window, _ = replay(paste(blank_frame((40, 40, 40)), tag, 800, 600))
+    found = window.find_templates(["top_operator_tag", "senior_operator_tag"])
+    assert found["top_operator_tag"] is not None
+    assert (found["top_operator_tag"].x, found["top_operator_tag"].y) == (800, 600)
+    assert found["senior_operator_tag"] is None
+
+    window, _ = replay(blank_frame((40, 40, 40)))
+    assert window.find_templates(["top_operator_tag", "senior_operator_tag"]) == {
+        "top_operator_tag": None, "senior_operator_tag": None}
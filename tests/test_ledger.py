@@ -0,0 +1,73 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import ledger
+from ledger import DailyLedger, atomic_write_json, read_json, server_day
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_server_day_rolls_over_at_the_reset():
+    # Global: 04:00 at UTC-7 is 11:00 UTC
+    assert server_day("global", utc(2026, 3, 10, 10, 59)) == date(2026, 3, 9)
+    assert server_day("global", utc(2026, 3, 10, 11, 0)) == date(2026, 3, 10)
+    # CN: 04:00 at UTC+8 is 20:00 UTC the day before
+    assert server_day("cn", utc(2026, 3, 10, 19, 59)) == date(2026, 3, 10)
+    assert server_day("cn", utc(2026, 3, 10, 20, 0)) == date(2026, 3, 11)
+
+
+def test_server_day_accepts_other_timezones_and_unknown_servers():
+    tokyo = timezone(timedelta(hours=9))
+    assert server_day("jp", datetime(2026, 3, 10, 4, 0, tzinfo=tokyo)) == date(2026, 3, 10)
+    assert server_day("jp", datetime(2026, 3, 10, 3, 59, tzinfo=tokyo)) == date(2026, 3, 9)
+    now = utc(2026, 3, 10, 12, 0)
+    assert server_day("nowhere", now) == server_day("global", now)
+
+
+def test_atomic_write_json_round_trip(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write_json(path, {"a": [1, 2]})
+    atomic_write_json(path, {"b": 3})
+    assert read_json(path) == {"b": 3}
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+
+def test_read_json_missing_or_corrupt(tmp_path):
+    assert read_json(str(tmp_path / "missing.json")) is None
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json")
+    assert read_json(str(broken)) is None
+
+
+def test_ledger_round_trip(tmp_path):
+    path = str(tmp_path / "ledger.json")
+    DailyLedger("main", "global", path).record("base", already_completed=True)
+    reloaded = DailyLedger("main", "global", path)
+    assert reloaded.is_done("base")
+    assert not reloaded.is_done("store")
+    assert reloaded.observed("base") == {"already_completed": True}
+    assert not DailyLedger("alt", "global", path).is_done("base")
+
+
+def test_ledger_forgets_entries_from_before_the_reset(tmp_path, monkeypatch):
+    path = str(tmp_path / "ledger.json")
+    book = DailyLedger("main", "global", path)
+    book.record("base")
+    tomorrow = server_day("global") + timedelta(days=1)
+    monkeypatch.setattr(ledger, "server_day", lambda server=None, now=None: tomorrow)
+    assert book.completed() == {}
+    book.record("store")
+    with open(path) as f:
+        assert json.load(f)["main"] == {"day": tomorrow.isoformat(), "tasks": {"store": book.completed()["store"]}}
+
+
+def test_ledger_clear(tmp_path):
+    path = str(tmp_path / "ledger.json")
+    book = DailyLedger("main", "global", path)
+    book.record("base")
+    DailyLedger("alt", "global", path).record("base")
+    book.clear()
+    assert book.completed() == {}
+    assert DailyLedger("alt", "global", path).is_done("base")
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from palette import PaletteClassifier, palette_classifier, rule_classifier
+
+PALETTE = {
+    'gold': (235, 220, 38),
+    'purple': (180, 130, 220),
+    'blue': (0, 152, 220),
+    'gray': (49, 49, 49),
+}
+
+RULES = (
+    ('upper', lambda r, g, b: (r < 190) & (b > 200)),
+    ('lower', lambda r, g, b: (r > 190) & (b < 190)),
+)
+
+
+def direct_palette(rgb, confidence):
+    """Reference: nearest palette color by plain RGB distance, per pixel."""
+    labels = list(PALETTE)
+    colors = np.array([PALETTE[n] for n in labels], dtype=np.float64)
+    dist = np.sqrt(((rgb[:, None, :].astype(np.float64) - colors[None]) ** 2).sum(axis=-1))
+    sim = 1.0 - dist / np.sqrt(3 * 255 ** 2)
+    best = sim.argmax(axis=1)
+    return [labels[i] if sim[n, i] >= confidence else None for n, i in enumerate(best)]
+
+
+def random_pixels(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(n, 3), dtype=np.uint8)
+    # Plus pixels close to every palette color, where the decisions happen
+    near = np.concatenate([np.clip(np.array(c) + rng.integers(-40, 41, size=(n // 4, 3)), 0, 255)
+                           for c in PALETTE.values()]).astype(np.uint8)
+    return np.concatenate([pixels, near])
+
+
+@pytest.mark.parametrize('confidence', [0.8, 0.9, 0.95])
+def test_palette_table_matches_direct_comparison(confidence):
+    pixels = random_pixels()
+    clf = PaletteClassifier.from_palette(PALETTE, confidence)
+    assert clf.classify(pixels) == direct_palette(pixels, confidence)
+
+
+def test_exact_confidence_compares_directly():
+    clf = PaletteClassifier.from_palette(PALETTE, 1.0)
+    assert clf.classify_one((235, 220, 38)) == 'gold'
+    assert clf.classify_one((235, 220, 39), default='none') == 'none'
+
+
+def test_rule_table_matches_direct_rules():
+    pixels = random_pixels(seed=1)
+    clf = PaletteClassifier.from_rules(RULES)
+    r, g, b = (pixels[:, i].astype(np.int32) for i in range(3))
+    upper = (r < 190) & (b > 200)
+    lower = ~upper & (r > 190) & (b < 190)
+    expected = ['upper' if u else 'lower' if l else None for u, l in zip(upper, lower)]
+    assert clf.classify(pixels) == expected
+
+
+def test_best_of_picks_most_similar_sample():
+    clf = palette_classifier(PALETTE, 0.9)
+    rows = np.array([
+        [(0, 0, 0), (236, 221, 40), (0, 140, 230)],  # gold is the closer match
+        [(10, 10, 10), (20, 20, 20), (255, 255, 255)],  # nothing close enough
+    ], dtype=np.uint8)
+    assert clf.best_of(rows, default='none') == ['gold', 'none']
+
+
+def test_builders_are_cached():
+    assert palette_classifier(PALETTE, 0.9) is palette_classifier(dict(PALETTE), 0.9)
+    assert rule_classifier(RULES) is rule_classifier(RULES)
+    assert palette_classifier(PALETTE, 0.9) is not palette_classifier(PALETTE, 0.95)
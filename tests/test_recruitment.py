@@ -0,0 +1,36 @@
+from dataclasses import replace
+
+from config import Settings
+from conftest import blank_frame
+from elements import get_element
+from scenarios import DailyRecruits
+
+
+def paint(frame, *names):
+    for name in names:
+        x, y = get_element(name).pixel_points[0][:2]
+        frame[y - 3:y + 4, x - 3:x + 4] = (255, 255, 255)
+    return frame
+
+
+def recruits(monkeypatch, ran):
+    dr = DailyRecruits(use_expedite=False, finish_on_recruitment=False)
+    monkeypatch.setattr(dr, 'run_plan', ran.append)
+    return dr
+
+
+def test_plans_from_the_settled_panel(replay, monkeypatch):
+    ran = []
+    frame = paint(blank_frame(), 'recruitment_indicator', *(f'recruitment_tile_{i}' for i in range(1, 5)))
+    replay(frame)
+    actions = recruits(monkeypatch, ran).do_daily_recruits()
+    assert ran == [actions]
+    assert actions and {slot for _, slot in actions} <= {1, 2, 3, 4}
+
+
+def test_no_plan_off_the_recruitment_panel(replay, monkeypatch):
+    monkeypatch.setattr(Settings, 'timeouts', replace(Settings.timeouts, default_timeout=0.3))
+    ran = []
+    replay(blank_frame())
+    assert recruits(monkeypatch, ran).do_daily_recruits() is None
+    assert ran == []
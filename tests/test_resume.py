@@ -0,0 +1,39 @@
+from checkpoint import CheckpointStore
+from scenarios import Friends, TaskAggregator
+
+
+def aggregator(tmp_path, monkeypatch, calls):
+    agg = TaskAggregator()
+    agg.checkpoints = CheckpointStore("main", "global", str(tmp_path / "checkpoint.json"))
+    monkeypatch.setattr(agg.main_menu, 'navigate_to', lambda state, max_taps=12: True)
+    monkeypatch.setattr(agg.friends, 'open_friends', lambda: calls.append('open'))
+    monkeypatch.setattr(agg.friends, 'exit_friends', lambda: calls.append('exit'))
+
+    def click_next_button(visits=Friends.VISITS, on_visit=None):
+        calls.append(('next', visits, on_visit is not None))
+        for n in range(1, visits + 1):
+            if on_visit is not None:
+                on_visit(n)
+    monkeypatch.setattr(agg.friends, 'click_next_button', click_next_button)
+    return agg
+
+
+def test_resumed_friends_step_past_visited_bases(tmp_path, monkeypatch):
+    calls = []
+    agg = aggregator(tmp_path, monkeypatch, calls)
+    agg._task_key = "friends"
+    agg.checkpoints.save("friends", "visiting", "unknown", visited=4)
+    agg._resume = agg.checkpoints.load()
+
+    assert agg.run_friends_dailies(return_to_menu=False)
+    assert calls == ['open', ('next', 4, False), ('next', Friends.VISITS - 4, True), 'exit']
+    assert agg.checkpoints.current.counters["visited"] == Friends.VISITS
+
+
+def test_fresh_friends_run_credits_every_visit(tmp_path, monkeypatch):
+    calls = []
+    agg = aggregator(tmp_path, monkeypatch, calls)
+    agg._task_key = "friends"
+
+    assert agg.run_friends_dailies(return_to_menu=False)
+    assert calls == ['open', ('next', Friends.VISITS, True), 'exit']
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+
+from config import Settings, load_user_settings
+from conftest import blank_frame
+
+
+def test_loaded_capture_settings_switch_the_live_window(tmp_path, monkeypatch):
+    from utils import ark_window
+    monkeypatch.setattr(Settings, 'capture', Settings.capture)
+    recording = str(tmp_path / "recording.npz")
+    np.savez(recording, frames=np.stack([blank_frame((1, 2, 3))]))
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({'capture': {'backend': 'replay', 'replay_path': recording, 'ring_size': 7}}))
+
+    assert load_user_settings(str(settings))
+    ark_window.apply_capture_settings()
+
+    assert ark_window.backend.name == 'replay'
+    assert ark_window.backend.source == recording
+    assert ark_window.frames.size == 7
+    assert tuple(ark_window.get_pixel_color(10, 10)) == (1, 2, 3)
+
+
+def test_unavailable_backend_keeps_the_current_one(tmp_path, monkeypatch, replay):
+    window, _ = replay(blank_frame())
+    current = window.backend
+    monkeypatch.setattr(Settings, 'capture', Settings.capture)
+    settings = tmp_path / "user_settings.json"
+    settings.write_text(json.dumps({'capture': {'backend': 'replay', 'replay_path': str(tmp_path / "missing")}}))
+
+    assert load_user_settings(str(settings))
+    window.apply_capture_settings()
+    assert window.backend is current
@@ -0,0 +1,73 @@
+import time
+
+from conftest import blank_frame
+from elements import get_element
+import states
+from states import (BASE_PANEL, CREDIT_STORE_PANEL, MAIN_MENU, STORE_PANEL, UNKNOWN, Edge, classify,
+                    get_state_indicator_element_name, navigate, shortest_path)
+
+
+def frame_showing(*state_names):
+    """Blank frame with the indicator points of the given states painted in."""
+    frame = blank_frame()
+    for state in state_names:
+        for x, y, rgb in get_element(get_state_indicator_element_name(state)).pixel_points:
+            frame[y - 3:y + 4, x - 3:x + 4] = rgb
+    return frame
+
+
+def test_classify_blank_screen_is_unknown(replay):
+    window, _ = replay(blank_frame())
+    assert classify(window).state == UNKNOWN
+
+
+def test_classify_each_state(replay):
+    for state in states.STATES:
+        window, _ = replay(frame_showing(state))
+        result = classify(window, frame=window.get_native_frame(fresh=True))
+        assert result.state == state
+        assert result.scores[state] == 1.0
+
+
+def test_classify_prefers_the_more_specific_state(replay):
+    # Main menu (3 indicator points) and base (1 point) both match
+    window, _ = replay(frame_showing(MAIN_MENU, BASE_PANEL))
+    assert classify(window, frame=window.get_native_frame(fresh=True)).state == MAIN_MENU
+
+
+def test_shortest_path_routes():
+    assert shortest_path(MAIN_MENU, MAIN_MENU) == []
+    assert [e.element for e in shortest_path(MAIN_MENU, BASE_PANEL)] == ["tile_base"]
+    route = shortest_path(BASE_PANEL, CREDIT_STORE_PANEL)
+    assert [e.element for e in route] == ["back_button", "tile_store", "credit_store_button"]
+    assert [e.target for e in route] == [MAIN_MENU, STORE_PANEL, CREDIT_STORE_PANEL]
+
+
+def test_shortest_path_unreachable():
+    edges = (Edge(MAIN_MENU, "tile_base", BASE_PANEL),)
+    assert shortest_path(BASE_PANEL, MAIN_MENU, edges) is None
+    assert shortest_path(MAIN_MENU, BASE_PANEL, edges) == list(edges)
+
+
+def test_navigate_taps_the_route(replay):
+    window, recorder = replay(frame_showing(MAIN_MENU))
+    assert not navigate(window, BASE_PANEL, max_taps=2, timeout=0.3)
+    x, y = window.get_absolute_coords(*get_element("tile_base").click_coords)
+    assert len(recorder.clicks) == 2
+    assert all(abs(cx - x) <= 4 and abs(cy - y) <= 4 for cx, cy in recorder.clicks)
+
+
+def test_navigate_stops_backing_out_of_unknown_screens(replay):
+    window, recorder = replay(blank_frame())
+    assert not navigate(window, BASE_PANEL, max_taps=12)
+    assert len(recorder.clicks) == states.MAX_BACK_OUTS
+
+
+def test_unknown_screen_settles_despite_animated_background(replay):
+    still = blank_frame()
+    animated = still.copy()
+    animated[340:740, 760:1160] = 200  # far from every indicator point
+    window, _ = replay(still, animated)
+    start = time.monotonic()
+    assert states._settled_classification(window, timeout=5).state == UNKNOWN
+    assert time.monotonic() - start < 2
@@ -0,0 +1,31 @@
+import time
+
+from conftest import blank_frame
+from elements import get_element
+from scenarios import Terminal
+
+
+def hud_frame():
+    frame = blank_frame()
+    for x, y, rgb in get_element('battle_hud').pixel_points:
+        frame[y - 3:y + 4, x - 3:x + 4] = rgb
+    return frame
+
+
+def test_battle_start_with_hud_cues_on_hud_gone(replay, monkeypatch):
+    monkeypatch.setattr(Terminal, 'BATTLE_START_GRACE_S', 1)
+    window, _ = replay(hud_frame())
+    battle_over = Terminal()._wait_battle_start()
+    assert battle_over is not None
+    assert not battle_over()
+
+    replay(blank_frame())
+    assert battle_over()
+
+
+def test_unrecognized_hud_falls_back_to_timed_wait(replay, monkeypatch):
+    monkeypatch.setattr(Terminal, 'BATTLE_START_GRACE_S', 0.3)
+    replay(blank_frame())
+    start = time.monotonic()
+    assert Terminal()._wait_battle_start() is None
+    assert time.monotonic() - start >= 0.3
@@ -0,0 +1,139 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from conftest import blank_frame
+from frames import ChangeDetector
+from waits import Wait
+
+
+def test_until_requires_consecutive_confirmations(replay):
+    window, _ = replay(blank_frame())
+    calls = []
+
+    def flickering():
+        calls.append(window.get_native_frame(fresh=True))
+        return len(calls) % 2 == 1
+
+    waiter = Wait(timeout=0.5, frame_source=window, require_stable_frames=2)
+    assert not waiter.until(flickering)
+    assert len(calls) > 2
+
+
+def test_stability_counts_distinct_frames(replay):
+    window, _ = replay(blank_frame(), blank_frame((10, 10, 10)))
+    window.get_native_frame(fresh=True)
+
+    # The same published frame read twice is one confirmation, not two
+    same = Wait(timeout=0.4, frame_source=window, require_stable_frames=2)
+    assert not same.until(lambda: True)
+    assert same.evaluations > 2
+
+    fresh = Wait(timeout=2, frame_source=window, require_stable_frames=3)
+    assert fresh.until(lambda: window.get_native_frame(fresh=True) is not None)
+    assert fresh.evaluations == 3
+
+
+def test_waits_wake_on_streamed_frames(replay):
+    window, _ = replay(blank_frame(), blank_frame((10, 10, 10)))
+    window.start_capture_thread(fps=50)
+    seen = set()
+
+    def record():
+        seen.add(window.latest_frame().frame_id)
+        return len(seen) >= 3
+
+    assert Wait(timeout=2, frame_source=window, require_stable_frames=1).until(record)
+    assert len(seen) == 3
+
+
+def test_not_before_future_delays_evaluation(replay):
+    window, _ = replay(blank_frame())
+    delivered = Future()
+    evaluated_at = []
+    timer = threading.Timer(0.2, lambda: delivered.set_result(time.monotonic()))
+    timer.start()
+
+    def predicate():
+        evaluated_at.append(time.monotonic())
+        window.get_native_frame(fresh=True)
+        return True
+
+    assert Wait(timeout=2, frame_source=window, not_before=delivered).until(predicate)
+    timer.join()
+    assert evaluated_at and min(evaluated_at) >= delivered.result()
+
+
+def test_failed_click_cancels_the_wait(replay):
+    window, _ = replay(blank_frame())
+    delivered = Future()
+    delivered.set_exception(RuntimeError("input backend gone"))
+    start = time.monotonic()
+    assert not Wait(timeout=2, frame_source=window, not_before=delivered).until(lambda: True)
+    assert time.monotonic() - start < 1
+
+
+def test_click_returns_delivery_future(replay):
+    window, recorder = replay(blank_frame())
+    before = time.monotonic()
+    delivered = window.click(100, 200)
+    assert delivered.done() and before <= delivered.result() <= time.monotonic()
+    assert recorder.clicks == [window.get_absolute_coords(100, 200)]
+
+
+def test_watch_skips_predicates_on_static_screen(replay):
+    window, _ = replay(blank_frame())
+    waiter = Wait(timeout=0.4, frame_source=window, watch=ChangeDetector())
+    assert not waiter.until(lambda: False)
+    assert waiter.evaluations == 1
+    assert waiter.skipped > 0
+
+
+def test_change_detector_tolerance():
+    still = np.zeros((40, 40, 4), dtype=np.uint8)
+    moved = still.copy()
+    moved[8, 8, :3] = 255
+    exact = ChangeDetector(step=1)
+    assert exact.changed(still)
+    assert not exact.changed(still.copy())
+    assert exact.changed(moved)
+    loose = ChangeDetector(step=1, tolerance=1.0)
+    loose.changed(still)
+    assert not loose.changed(moved)
+
+
+def test_cue_gates_predicates_and_backs_off(replay):
+    window, _ = replay(blank_frame())
+    waiter = Wait(timeout=0.6, frame_source=window, cue=lambda: False, coarse_interval=0.2)
+    assert not waiter.until(lambda: True)
+    assert waiter.evaluations == 0
+    # 0.15 s, then 0.2 s polls: far fewer than at the normal rate
+    assert 2 <= waiter.coarse_polls <= 5
+
+
+def test_wait_until_stable_sees_small_changes(replay):
+    still = blank_frame()
+    blinking = still.copy()
+    blinking[500:520, 500:520] = 255  # 400 px, ~0.02% of the window
+    window, _ = replay(still, blinking)
+    assert not window.wait_until_stable(region=(400, 400, 300, 300), min_stable_ms=100, timeout=0.5)
+    assert window.wait_until_stable(region=(1000, 400, 300, 300), min_stable_ms=100, timeout=1)
+
+
+def test_wait_until_stable_or_until(replay):
+    still = blank_frame()
+    blinking = still.copy()
+    blinking[500:520, 500:520] = 255
+    window, _ = replay(still, blinking)
+    start = time.monotonic()
+    assert window.wait_until_stable(region=(400, 400, 300, 300), timeout=2, or_until=lambda: True)
+    assert time.monotonic() - start < 1
+
+
+def test_wait_gone_returns_at_once_when_gone(replay):
+    window, _ = replay(blank_frame())
+    start = time.monotonic()
+    assert window.wait_gone('buy_button_credit_store', timeout=3)
+    assert time.monotonic() - start < 0.25
@@ -1,26 +1,30 @@
-from os import name
+import atexit
 import os
 import random
-from typing import List, Optional, Tuple, Union
-import re
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple, Union
 import time
 
-from PIL.ImageChops import screen
-from time import sleep
-import pyautogui as pg
-import pygetwindow as gw
-import mss
+try:
+    import pygetwindow as gw
+except Exception:  # not available on Linux; window lookup then needs a backend that provides it
+    gw = None
 import numpy as np
 import math
-from logger import logger
+from logger import logger, suppress_debug
 from config import Settings
 from waits import Wait
-from elements import get_element, UIElement
+from frames import ChangeDetector, Frame, FrameProducer, FrameRing, rgb_view
+from capture import CaptureBackend, backend_from_settings
+from inputs import ClickDispatcher, InputBackend, input_backend_from_settings
+from elements import ELEMENTS, ElementTable, compile_elements, get_element, rgb_to_native, UIElement
 import states as _states
+from templates import TemplateMatch, TemplateMatcher
 from PIL import Image, ImageDraw
 
-pg.FAILSAFE = False # Nothing can possibly go wrong with this, right?
-
 def get_arknights_window_title(keywords_to_exclude=None):
     """Get the title of the Arknights window, being more specific."""
     if keywords_to_exclude is None:
@@ -29,6 +33,9 @@ def get_arknights_window_title(keywords_to_exclude=None):
     # Add default keywords to a new list to avoid modifying the default
     all_keywords_to_exclude = keywords_to_exclude + ['arknights_dalies_automation', 'dailies', 'visual studio code', '.py']
 
+    if gw is None:
+        logger.warning("pygetwindow is unavailable; cannot look up the Arknights window.")
+        return None
     windows = gw.getAllWindows()
     
     # First, look for a perfect match
@@ -57,6 +64,8 @@ def get_window_info(window_title):
         logger.warning("get_window_info called with an empty title.")
         return None
 
+    if gw is None:
+        return None
     windows = gw.getWindowsWithTitle(window_title)
 
     # Prefer an exact match to avoid ambiguity
@@ -76,6 +85,16 @@ def get_window_info(window_title):
     logger.warning(f"No exact match for '{window_title}' found. Aborting to prevent errors.")
     return None
 
+@dataclass(frozen=True)
+class ColorBlob:
+    """Connected region of pixels matching a target color (see ArknightsWindow.find_color)."""
+    color: Tuple[int, int, int]  # target RGB that matched
+    centroid: Tuple[float, float]  # window-relative pixels
+    bbox: Tuple[int, int, int, int]  # window-relative x, y, w, h
+    area: int  # matching pixels
+    base_center: Tuple[int, int]  # centroid in base 1920x1080 coords (for click/tap)
+
+
 windowed_offsets = {
     'google_play': (9, 8, 31, 8)
 }
@@ -85,11 +104,20 @@ windowed_offsets = {
 class ArknightsWindow:
     """Class to manage the Arknights window."""
     
-    def __init__(self, title=None, windowed_mode_interface='google_play'):
-        if title is None:
+    def __init__(self, title=None, windowed_mode_interface='google_play',
+                 backend: Optional[CaptureBackend] = None,
+                 input_backend: Optional[InputBackend] = None):
+        # Where pixels (and, for replay, the window itself) come from; mss by default
+        self.backend = backend if backend is not None else backend_from_settings()
+        # Created on first click so perception-only use needs no GUI input library
+        self._input = input_backend
+        self._click_ms_avg = None
+        self._click_dispatcher: Optional[ClickDispatcher] = None
+        self._dispatcher_lock = threading.Lock()
+        if title is None and not self.backend.provides_windows:
             title = get_arknights_window_title()
         self.title = title
-        self.window = get_window_info(title)
+        self.window = self._lookup_window()
         # Provide safe defaults if window is not available
         if self.window:
             self.width = self.window['width']
@@ -97,9 +125,22 @@ class ArknightsWindow:
         else:
             self.width = 1920
             self.height = 1080
+        self._window_checked_at = time.monotonic()
         self.last_screenshot = None
         self._last_frame_time = 0.0
         self._frame_max_age_ms = 50.0  # simple frame cache
+        # Per-thread capture state (pinned frames); backend sessions are per thread too
+        self._capture_local = threading.local()
+        self._capture_lock = threading.RLock()
+        self._capture_ms_avg = None
+        # Every capture is published here; the optional producer thread keeps it warm
+        self.frames = FrameRing(Settings.capture.ring_size)
+        self._producer: Optional[FrameProducer] = None
+        # Element registry compiled to arrays, rescaled only when the geometry key changes
+        self._element_table: Optional[ElementTable] = None
+        self._element_table_key = None
+        # Template elements: scaled templates and last match positions
+        self.templates = TemplateMatcher()
         self.is_windowed = False
 
         # Safety/UX
@@ -111,23 +152,88 @@ class ArknightsWindow:
         self.windowed_offset_right = windowed_offsets.get(windowed_mode_interface, 0)[1]
         self.windowed_offset_top = windowed_offsets.get(windowed_mode_interface, 0)[2]
         self.windowed_offset_bottom = windowed_offsets.get(windowed_mode_interface, 0)[3]
-        
-        with mss.mss() as sct:
-            monitor = sct.monitors[0]
-            self.offset_x = monitor['left']
-            self.offset_y = monitor['top']
-        logger.debug(f"ArknightsWindow initialized: title={self.title}, size=({self.width}x{self.height}), offsets=({self.offset_x},{self.offset_y})")
-
-    def refresh_window_info(self):
-        """Refresh window information in case window moved/resized."""
+        # Virtual screen offsets come from the capture session, which opens on first use
+        logger.debug(f"ArknightsWindow initialized: title={self.title}, size=({self.width}x{self.height}), backend={self.backend.name}")
+
+    @property
+    def offset_x(self) -> int:
+        return self.backend.virtual_screen()['left']
+
+    @property
+    def offset_y(self) -> int:
+        return self.backend.virtual_screen()['top']
+
+    def _lookup_window(self):
+        if self.backend.provides_windows:
+            return self.backend.locate_window(self.title)
+        return get_window_info(self.title)
+
+    def set_backend(self, backend: CaptureBackend):
+        """Switch capture backend; frame caches and window geometry are dropped."""
+        with self._capture_lock:
+            self.stop_capture_thread()
+            self.backend.close()
+            self.backend = backend
+            self.last_screenshot = None
+            self._last_frame_time = 0.0
+            self._capture_ms_avg = None
+            self.refresh_window_info(force=True)
+        logger.info(f"Capture backend set to {backend.name}")
+
+    def apply_capture_settings(self):
+        """Apply Settings.capture to this window after it changed (e.g. load_user_settings()).
+
+        The module-level window is built at import, before user settings are loaded:
+        the backend is replaced when its kind or replay source differs, and the frame
+        ring when its size does. A backend that cannot be created is logged and the
+        current one kept.
+        """
+        cfg = Settings.capture
+        if self.backend.name != cfg.backend or (
+                cfg.backend == 'replay' and getattr(self.backend, 'source', None) != cfg.replay_path):
+            try:
+                backend = backend_from_settings()
+            except Exception as ex:
+                logger.error(f"Capture backend '{cfg.backend}' unavailable, keeping {self.backend.name}: {ex}")
+            else:
+                self.set_backend(backend)
+        if self.frames.size != cfg.ring_size:
+            with self._capture_lock:
+                self.stop_capture_thread()
+                self.frames = FrameRing(cfg.ring_size)
+            logger.debug(f"Frame ring resized to {cfg.ring_size}")
+
+    def refresh_window_info(self, force: bool = False):
+        """Refresh window information in case window moved/resized.
+
+        The window lookup is cached for Settings.capture.window_geometry_ttl_ms, so
+        steady-state calls are free; a moved/resized window is picked up within
+        the TTL, or immediately after invalidate_window_info()/force=True.
+        """
+        now = time.monotonic()
+        ttl_s = Settings.capture.window_geometry_ttl_ms / 1000.0
+        if not force and self._window_checked_at is not None and (now - self._window_checked_at) < ttl_s:
+            return
+        self._window_checked_at = now
         old_size = (self.width, self.height)
-        self.window = get_window_info(self.title)
+        self.window = self._lookup_window()
         if self.window:
             self.width = self.window['width']
             self.height = self.window['height']
             if (self.width, self.height) != old_size:
                 logger.debug(f"Window size changed from {old_size} to ({self.width},{self.height})")
 
+    def invalidate_window_info(self):
+        """Force the next refresh_window_info() to query the window again."""
+        self._window_checked_at = None
+
+    def _frame_looks_wrong(self, frame: np.ndarray) -> bool:
+        """Unexpected size or all-black content usually means stale window geometry."""
+        if frame.shape[:2] != (self.height, self.width):
+            return True
+        # Sparse sample is enough to tell a black (minimized/moved-away) capture
+        return not frame[::32, ::32, :3].any()
+
     def get_scaled_coords(self, base_x, base_y,
                           base_w=1920, base_h=1080):
         """Return _window-relative_ coords, scaled to current size."""
@@ -144,6 +250,19 @@ class ArknightsWindow:
         logger.debug(f"Scaled coords: base=({base_x},{base_y}) -> {scaled}")
         return scaled
     
+    def get_scaled_coords_array(self, base_xs, base_ys,
+                                base_w=1920, base_h=1080) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized get_scaled_coords: arrays of base coords -> window-relative int arrays."""
+        xs = np.asarray(base_xs, dtype=np.float64)
+        ys = np.asarray(base_ys, dtype=np.float64)
+        if self.is_windowed:
+            xs = xs + self.windowed_offset_left
+            ys = ys + self.windowed_offset_top
+            base_w -= (self.windowed_offset_left + self.windowed_offset_right)
+            base_h -= (self.windowed_offset_top + self.windowed_offset_bottom)
+        # Same float math and truncation as int(base_x * width / base_w)
+        return (xs * self.width / base_w).astype(np.intp), (ys * self.height / base_h).astype(np.intp)
+
     def get_absolute_coords(self, base_x, base_y,
                           base_w=1920, base_h=1080):
         """Return _screen-relative_ coords, scaled to current size."""
@@ -156,18 +275,36 @@ class ArknightsWindow:
         logger.debug(f"Absolute coords: base=({base_x},{base_y}) -> {absolute}")
         return absolute
     
-    def make_screenshot(self):
-        """Grab the full virtual screen, then crop to the window (original behavior)."""
-        self.refresh_window_info()
+    # --- Capture session ---
+    def _window_outside_virtual_screen(self) -> bool:
+        """True when the window no longer fits the backend's cached display layout."""
         if not self.window:
-            # Return a blank frame to prevent crashes when window is not available
-            if self.last_screenshot is None:
-                self.last_screenshot = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-                self._last_frame_time = time.time()
-            return self.last_screenshot
-        with mss.mss() as sct:
-            mon = sct.monitors[0]   # full virtual screen
-            full = np.array(sct.grab(mon))[:, :, :3][:, :, ::-1]
+            return False
+        mon = self.backend.virtual_screen()
+        if not mon:
+            return False
+        return (self.window['left'] < mon['left'] or
+                self.window['top'] < mon['top'] or
+                self.window['left'] + self.width > mon['left'] + mon['width'] or
+                self.window['top'] + self.height > mon['top'] + mon['height'])
+
+    def close_capture_session(self):
+        """Release the calling thread's backend session; the next capture opens a new one."""
+        self.backend.close()
+
+    def capture_latency_ms(self) -> Optional[float]:
+        """Moving average of the time spent grabbing a frame, in milliseconds."""
+        return self._capture_ms_avg
+
+    def _record_capture_time(self, t0: float) -> float:
+        grab_ms = (time.perf_counter() - t0) * 1000.0
+        self._capture_ms_avg = grab_ms if self._capture_ms_avg is None else 0.9 * self._capture_ms_avg + 0.1 * grab_ms
+        return grab_ms
+
+    def _grab_full_cropped(self):
+        """Grab the full virtual screen, then crop to the window (original behavior)."""
+        mon = self.backend.virtual_screen()   # full virtual screen
+        full = self.backend.grab(mon)
 
         # compute window’s top-left _inside_ that full image
         left_in_full = self.window['left'] - mon['left']
@@ -175,27 +312,169 @@ class ArknightsWindow:
 
         # slice out just the Arknights window
         w, h = self.width, self.height
-        cropped = full[top_in_full: top_in_full + h,
-                       left_in_full: left_in_full + w]
+        return full[top_in_full: top_in_full + h,
+                    left_in_full: left_in_full + w]
+
+    def _grab_rect(self, left: int, top: int, width: int, height: int):
+        """Grab only the given screen rectangle from the backend (native BGRA view)."""
+        rect = {'left': int(left), 'top': int(top), 'width': int(width), 'height': int(height)}
+        return self.backend.grab(rect)
+
+    def grab_region(self, x: int, y: int, w: int, h: int):
+        """Grab a window-relative pixel rectangle (already scaled) without touching the frame cache.
+
+        Returns a native BGRA array. The rectangle is clipped to the window; an
+        empty clip yields an empty array.
+        """
+        self.refresh_window_info()
+        x1, y1 = max(0, int(x)), max(0, int(y))
+        x2, y2 = min(self.width, int(x) + int(w)), min(self.height, int(y) + int(h))
+        if not self.window or x2 <= x1 or y2 <= y1:
+            return np.zeros((max(0, y2 - y1), max(0, x2 - x1), 4), dtype=np.uint8)
+        if Settings.capture.mode == 'full' or self._window_outside_virtual_screen():
+            return self._grab_full_cropped()[y1:y2, x1:x2]
+        t0 = time.perf_counter()
+        region = self._grab_rect(self.window['left'] + x1, self.window['top'] + y1, x2 - x1, y2 - y1)
+        grab_ms = self._record_capture_time(t0)
+        logger.debug(f"Region captured: ({x1},{y1},{x2 - x1},{y2 - y1}) grab={grab_ms:.1f}ms")
+        return region
+
+    def make_screenshot(self):
+        """Capture the Arknights window.
+
+        In 'window' capture mode only the window rectangle is requested from the
+        backend; 'full' mode (and any window not fully on screen) falls back to
+        grabbing the whole virtual screen and cropping.
+        """
+        with self._capture_lock:
+            return self._make_screenshot_locked()
+
+    def _make_screenshot_locked(self):
+        self.refresh_window_info()
+        if not self.window:
+            # Return a blank frame to prevent crashes when window is not available
+            if self.last_screenshot is None:
+                self.last_screenshot = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+                self._last_frame_time = time.time()
+            return self.last_screenshot
+        if self._window_outside_virtual_screen():
+            # Monitors were added/removed/rearranged since the session was opened
+            logger.debug("Window outside cached virtual screen; reopening capture session")
+            self.backend.reset()
+        t0 = time.perf_counter()
+        try:
+            if Settings.capture.mode == 'window' and not self._window_outside_virtual_screen():
+                cropped = self._grab_rect(self.window['left'], self.window['top'], self.width, self.height)
+            else:
+                cropped = self._grab_full_cropped()
+        except Exception:
+            self.invalidate_window_info()
+            raise
+        grab_ms = self._record_capture_time(t0)
+        if self._frame_looks_wrong(cropped):
+            logger.debug(f"Capture looks stale (shape={cropped.shape}); invalidating window geometry")
+            self.invalidate_window_info()
 
         self.last_screenshot = cropped
         self._last_frame_time = time.time()
-        logger.debug(f"Screenshot captured: cropped size={cropped.shape}")
+        self.frames.publish(cropped)
+        logger.debug(f"Screenshot captured: cropped size={cropped.shape}, grab={grab_ms:.1f}ms")
         return cropped
 
-    def get_frame(self, fresh: bool = False):
-        """Return a possibly cached frame; refresh if too old or requested fresh."""
+    # --- Background capture ---
+    def start_capture_thread(self, fps: Optional[float] = None):
+        """Start grabbing frames continuously in the background (no-op if running)."""
+        if self.capture_thread_running():
+            return
+        self._producer = FrameProducer(self.make_screenshot,
+                                       fps=fps or Settings.capture.fps,
+                                       on_stop=self.close_capture_session,
+                                       name="arknights-capture")
+        self._producer.start()
+
+    def stop_capture_thread(self):
+        producer, self._producer = self._producer, None
+        if producer is not None:
+            producer.stop()
+
+    def capture_thread_running(self) -> bool:
+        return self._producer is not None and self._producer.is_running()
+
+    def latest_frame(self) -> Optional[Frame]:
+        """Newest published frame (with id and timestamp), if any."""
+        return self.frames.latest()
+
+    def wait_for_new_frame(self, after_id: int, timeout: float) -> Optional[Frame]:
+        """Block until a frame newer than after_id is published; None on timeout."""
+        return self.frames.wait_newer(after_id, timeout)
+
+    @contextmanager
+    def pin_frame(self, frame: Frame):
+        """Make non-fresh frame reads on this thread return `frame` inside the block."""
+        local = self._capture_local
+        previous = getattr(local, 'pinned', None)
+        local.pinned = frame
+        try:
+            yield frame
+        finally:
+            local.pinned = previous
+
+    def close(self):
+        """Stop background capture and release the capture and input sessions."""
+        self.stop_capture_thread()
+        self.close_capture_session()
+        self.stop_click_dispatcher()
+        if self._input is not None:
+            self._input.close()
+
+    def _streamed_frame(self, fresh: bool) -> Optional[np.ndarray]:
+        """Newest frame from the producer, or None to fall back to a synchronous grab."""
+        latest = self.frames.latest()
+        producer = self._producer
+        if latest is None or producer is None:
+            return None
+        interval = producer.interval
+        if fresh:
+            newer = self.frames.wait_newer(latest.frame_id, timeout=3 * interval)
+            return newer.image if newer is not None else None
+        # Producer stalled (e.g. window lost): don't serve an old frame forever
+        max_age = max(self._frame_max_age_ms / 1000.0, 4 * interval)
+        if time.monotonic() - latest.timestamp > max_age:
+            return None
+        return latest.image
+
+    def get_native_frame(self, fresh: bool = False) -> np.ndarray:
+        """Return a possibly cached native BGRA frame; refresh if too old or requested fresh.
+
+        The array wraps the backend buffer without copying. With the background
+        capture thread running this returns the newest streamed frame without
+        blocking on a grab.
+        """
+        pinned = getattr(self._capture_local, 'pinned', None)
+        if pinned is not None and not fresh:
+            return pinned.image
+        if Settings.capture.background_thread:
+            self.start_capture_thread()
+        if self.capture_thread_running():
+            streamed = self._streamed_frame(fresh)
+            if streamed is not None:
+                return streamed
         now = time.time()
         if (not fresh and self.last_screenshot is not None and
                 (now - self._last_frame_time) * 1000.0 <= self._frame_max_age_ms):
             return self.last_screenshot
         return self.make_screenshot()
 
+    def get_frame(self, fresh: bool = False) -> np.ndarray:
+        """Return a possibly cached frame as an RGB view (no copy) of the native frame."""
+        return rgb_view(self.get_native_frame(fresh=fresh))
+
     def get_pixel_color(self, x, y):
         """Get the color of a pixel at (x, y) in the Arknights window."""
-        screenshot = self.get_frame(fresh=False)
+        screenshot = self.get_native_frame(fresh=False)
         x, y = self.get_scaled_coords(x, y)
-        color = tuple(screenshot[y, x].tolist())
+        b, g, r = screenshot[y, x, :3]
+        color = (int(r), int(g), int(b))
         logger.debug(f"Pixel color at ({x},{y}): {color}")
         return color
 
@@ -204,15 +483,16 @@ class ArknightsWindow:
         return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
 
     def _roi_median_color(self, frame: np.ndarray, cx: int, cy: int, half: int) -> Tuple[int, int, int]:
+        """Median color of a square ROI in a native BGRA frame, as an RGB tuple."""
         h, w, _ = frame.shape
         x1 = max(0, cx - half)
         y1 = max(0, cy - half)
         x2 = min(w - 1, cx + half)
         y2 = min(h - 1, cy + half)
-        roi = frame[y1:y2 + 1, x1:x2 + 1]
-        # median over ROI, return as RGB tuple
+        roi = frame[y1:y2 + 1, x1:x2 + 1, :3]
+        # median over ROI (BGR), return as RGB tuple
         med = np.median(roi.reshape(-1, 3), axis=0)
-        return (int(med[0]), int(med[1]), int(med[2]))
+        return (int(med[2]), int(med[1]), int(med[0]))
 
     def check_color_at_robust(self, base_x, base_y, expected_rgb, confidence: Optional[float] = None):
         """Robust color check with ROI sampling and tolerance.
@@ -220,7 +500,7 @@ class ArknightsWindow:
         This does not change the original check_color_at API; use this in new flows.
         """
         expected_rgb = tuple(expected_rgb)
-        frame = self.get_frame(fresh=False)
+        frame = self.get_native_frame(fresh=False)
         sx, sy = self.get_scaled_coords(base_x, base_y)
         half = Settings.colors.roi_half_size
         found_rgb = self._roi_median_color(frame, sx, sy, half)
@@ -238,11 +518,16 @@ class ArknightsWindow:
         logger.debug(f"Checking color at base=({base_x},{base_y}), expected={expected_rgb}, confidence={confidence}")
         # Refresh window info before checking
         self.refresh_window_info()
-        expected_rgb = tuple(expected_rgb)
-        found_rgb = self.get_pixel_color(base_x, base_y)
+        # Compare in the frame's native BGR order: one indexed read, no channel flip
+        expected = rgb_to_native(tuple(expected_rgb))
+        frame = self.get_native_frame(fresh=False)
+        sx, sy = self.get_scaled_coords(base_x, base_y)
+        px = frame[sy, sx]
+        found = (int(px[0]), int(px[1]), int(px[2]))
+        logger.debug(f"Pixel color at ({sx},{sy}): {found[::-1]}")
         if confidence < 1:
             # Calculate color distance (0-255 per channel)
-            distance = math.sqrt(sum((a - b) ** 2 for a, b in zip(found_rgb, expected_rgb)))
+            distance = math.sqrt(sum((a - b) ** 2 for a, b in zip(found, expected)))
             max_distance = math.sqrt(3 * 255 ** 2)  # Maximum possible distance
             
             # Convert confidence to threshold (higher confidence = lower threshold)
@@ -251,27 +536,173 @@ class ArknightsWindow:
             logger.debug(f"Distance={distance:.2f}, threshold={threshold:.2f}, pass={result}")
             return result
             
-        result = found_rgb == expected_rgb
+        result = found == expected
         logger.debug(f"Exact match pass={result}")
         return result
 
-    def click(self, base_x, base_y):
+    # --- Batch pixel checks ---
+    def _match_native(self, frame: np.ndarray, sx: np.ndarray, sy: np.ndarray,
+                      expected_native: np.ndarray, confidence: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather N scaled points from one native frame and match them against BGR colors.
+
+        Returns (passed bool[N], found BGR uint8[N, 3]). Points outside the frame fail.
+        """
+        h, w = frame.shape[:2]
+        inside = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+        found = frame[np.where(inside, sy, 0), np.where(inside, sx, 0), :3]
+        diff = found.astype(np.int32) - expected_native.astype(np.int32)
+        dist2 = np.einsum('ij,ij->i', diff, diff)
+        # Convert confidence to threshold (higher confidence = lower threshold)
+        threshold = (1.0 - confidence) * math.sqrt(3 * 255 ** 2)
+        passed = np.where(confidence >= 1.0, dist2 == 0, dist2 <= threshold * threshold) & inside
+        return passed, found
+
+    def element_table(self) -> ElementTable:
+        """Compiled ELEMENTS with coords scaled for the current window (cached)."""
+        key = (self.width, self.height, self.is_windowed, len(ELEMENTS))
+        if self._element_table is None or self._element_table_key != key:
+            base = self._element_table
+            if base is None or self._element_table_key[3] != key[3]:
+                base = compile_elements()
+            sx, sy = self.get_scaled_coords_array(base.base_xy[:, 0], base.base_xy[:, 1])
+            self._element_table = replace(base, scaled_xy=np.stack([sx, sy], axis=1))
+            self._element_table_key = key
+            logger.debug(f"Element table compiled: {len(base.names)} elements, {len(base.base_xy)} points for {key[:3]}")
+        return self._element_table
+
+    def check_elements(self, names, confidence: Optional[float] = None,
+                       frame: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Check the pixel anchors of several registered elements against one frame.
+
+        Returns (passed bool[N], found RGB uint8[N, 3], rows) where rows are the
+        table rows in `names` order; use element_table().slices to split them.
+        """
+        self.refresh_window_info()
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        table = self.element_table()
+        rows = table.rows(list(names))
+        conf = np.full(len(rows), 1.0 if confidence is None else float(confidence))
+        xy = table.scaled_xy[rows]
+        passed, found = self._match_native(frame, xy[:, 0], xy[:, 1], table.expected_native[rows], conf)
+        return passed, found[:, ::-1], rows
+
+    def check_many(self, probes, frame: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Check N (x, y, rgb, confidence) probes against a single frame.
+
+        Coordinates are base (1920x1080) coords; confidence None means exact match.
+        All points are gathered with one fancy-indexing read and compared in numpy.
+        Returns (passed bool[N], found RGB uint8[N, 3]).
+        """
+        probes = list(probes)
+        if not probes:
+            return np.zeros(0, dtype=bool), np.zeros((0, 3), dtype=np.uint8)
+        self.refresh_window_info()
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        xs, ys, colors, confs = zip(*probes)
+        sx, sy = self.get_scaled_coords_array(xs, ys)
+        expected = np.array([rgb_to_native(tuple(c)) for c in colors], dtype=np.uint8)
+        conf = np.array([1.0 if c is None else c for c in confs], dtype=np.float64)
+        passed, found = self._match_native(frame, sx, sy, expected, conf)
+        return passed, found[:, ::-1]
+
+    def sample_colors(self, base_xs, base_ys, frame: Optional[np.ndarray] = None) -> np.ndarray:
+        """RGB colors (uint8[N, 3]) at N base coords, read from one frame in one gather.
+
+        Points outside the frame read as black.
+        """
+        self.refresh_window_info()
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        sx, sy = self.get_scaled_coords_array(base_xs, base_ys)
+        h, w = frame.shape[:2]
+        inside = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+        found = frame[np.where(inside, sy, 0), np.where(inside, sx, 0), 2::-1]
+        found[~inside] = 0
+        return found
+
+    # --- Input ---
+    @property
+    def input(self) -> InputBackend:
+        if self._input is None:
+            self._input = input_backend_from_settings()
+        return self._input
+
+    def set_input_backend(self, backend: InputBackend):
+        if self._input is not None:
+            self._input.close()
+        self._input = backend
+        self._click_ms_avg = None
+        logger.info(f"Input backend set to {backend.name}")
+
+    def click_latency_ms(self) -> Optional[float]:
+        """Moving average of the time spent inside the backend's click call, in milliseconds."""
+        return self._click_ms_avg
+
+    def _deliver_click(self, x: int, y: int):
+        t0 = time.perf_counter()
+        self.input.click(x, y)
+        click_ms = (time.perf_counter() - t0) * 1000.0
+        self._click_ms_avg = click_ms if self._click_ms_avg is None else 0.9 * self._click_ms_avg + 0.1 * click_ms
+
+    def _dispatcher(self) -> ClickDispatcher:
+        with self._dispatcher_lock:
+            if self._click_dispatcher is None or not self._click_dispatcher.is_running():
+                self._click_dispatcher = ClickDispatcher(self._deliver_click)
+            return self._click_dispatcher
+
+    def _send_click(self, x: int, y: int) -> Future:
+        """Click at absolute coords; the Future resolves to the delivery time (time.monotonic()).
+
+        With Settings.clicks.async_dispatch the click is queued to the dispatcher
+        thread and this returns immediately; otherwise it is delivered inline.
+        """
+        if Settings.clicks.async_dispatch:
+            return self._dispatcher().submit(x, y)
+        self._deliver_click(x, y)
+        delivered: Future = Future()
+        delivered.set_result(time.monotonic())
+        return delivered
+
+    def _click_now(self, x: int, y: int):
+        """Click and block until the click has been delivered."""
+        self._send_click(x, y).result()
+
+    def stop_click_dispatcher(self):
+        with self._dispatcher_lock:
+            dispatcher, self._click_dispatcher = self._click_dispatcher, None
+        if dispatcher is not None:
+            dispatcher.stop()
+
+    def press_key(self, key: str):
+        """Press a key (pyautogui key name) through the input backend."""
+        if self._dry_run:
+            logger.info(f"[DRY-RUN] press '{key}'")
+            return
+        self.input.press(key)
+
+    def click(self, base_x, base_y) -> Optional[Future]:
         """
         Clicks at the given base coordinates after converting them to absolute screen coordinates.
         
         Args:
             base_x (int): The base x-coordinate (relative to 1920x1080).
             base_y (int): The base y-coordinate (relative to 1920x1080).
+
+        Returns the (completed) delivery Future, usable as a wait's not_before; None if no click was sent.
         """
         if not self.window:
             logger.info("Click ignored: Arknights window not found")
-            return
+            return None
         absolute_coords = self.get_absolute_coords(base_x, base_y)
         logger.debug(f"Clicking at base coords ({base_x}, {base_y}) -> absolute {absolute_coords}")
         if self._dry_run:
             logger.info(f"[DRY-RUN] click at {absolute_coords}")
-            return
-        pg.click(*absolute_coords)
+            return None
+        delivered = self._send_click(*absolute_coords)
+        delivered.result()
+        return delivered
 
     # --- Ergonomic API ---
     def _jitter_coords(self, base_x: int, base_y: int) -> Tuple[int, int]:
@@ -304,19 +735,28 @@ class ArknightsWindow:
         if not el:
             return False
         # Strategy 1: pixel points
-        if el.pixel_points:
+        if el.pixel_points and use_single_pixel:
+            # default to exact if confidence not specified; all points from one frame
+            conf = 1 if confidence is None else confidence
+            if ELEMENTS.get(el.name) is el:
+                # Registered element: index straight into the precompiled table
+                passed, found, _ = self.check_elements([el.name], confidence=conf)
+            else:
+                passed, found = self.check_many((x, y, rgb, conf) for (x, y, rgb) in el.pixel_points)
+            if log_checks:
+                name = getattr(el, 'name', str(element_or_name))
+                for idx, ((x, y, rgb), ok, found_rgb) in enumerate(zip(el.pixel_points, passed, found.tolist()), start=1):
+                    status = "PASS" if ok else "FAIL"
+                    logger.debug(f"[{name}] check {idx} at ({x},{y}) expected={rgb} found={tuple(found_rgb)} -> {status}")
+            if passed.all():
+                return True
+        elif el.pixel_points:
             ok = True
             for idx, (x, y, rgb) in enumerate(el.pixel_points, start=1):
-                if use_single_pixel:
-                    # default to exact if confidence not specified
-                    conf = 1 if confidence is None else confidence
-                    found_rgb = self.get_pixel_color(x, y)
-                    passed = self.check_color_at(x, y, rgb, confidence=conf)
-                else:
-                    frame = self.get_frame(fresh=False)
-                    sx, sy = self.get_scaled_coords(x, y)
-                    found_rgb = self._roi_median_color(frame, sx, sy, Settings.colors.roi_half_size)
-                    passed = self.check_color_at_robust(x, y, rgb, confidence=confidence)
+                frame = self.get_native_frame(fresh=False)
+                sx, sy = self.get_scaled_coords(x, y)
+                found_rgb = self._roi_median_color(frame, sx, sy, Settings.colors.roi_half_size)
+                passed = self.check_color_at_robust(x, y, rgb, confidence=confidence)
                 if log_checks:
                     status = "PASS" if passed else "FAIL"
                     name = getattr(el, 'name', str(element_or_name))
@@ -326,22 +766,248 @@ class ArknightsWindow:
                     break
             if ok:
                 return True
-        # Strategy 2: TODO template matching if template_path is provided
-        # (left as future extension to avoid changing dependencies)
+        # Strategy 2: template matching
+        if el.template_path:
+            threshold = el.template_threshold if confidence is None else confidence
+            match = self.find_template(el, threshold=threshold)
+            if log_checks:
+                logger.debug(f"[{el.name}] template {el.template_path} -> {match}")
+            return match is not None
         return False
 
-    def wait_visible(self, element_or_name: Union[UIElement, str], timeout: Optional[float] = None, use_single_pixel: bool = True) -> bool:
+    def _template_scale(self, base_w=1920, base_h=1080) -> Tuple[float, float]:
+        """Window/base scale factors, matching get_scaled_coords."""
+        if self.is_windowed:
+            base_w -= (self.windowed_offset_left + self.windowed_offset_right)
+            base_h -= (self.windowed_offset_top + self.windowed_offset_bottom)
+        return self.width / base_w, self.height / base_h
+
+    def find_template(self, element_or_name: Union[UIElement, str], threshold: Optional[float] = None,
+                      frame: Optional[np.ndarray] = None) -> Optional[TemplateMatch]:
+        """Locate an element's template in the current frame (window-relative match or None)."""
+        el = element_or_name if isinstance(element_or_name, UIElement) else get_element(element_or_name)
+        if not el or not el.template_path:
+            return None
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        roi = self._base_rect_to_window(el.search_roi) if el.search_roi else None
+        return self.templates.match(el.name, el.template_path, frame,
+                                    el.template_threshold if threshold is None else threshold,
+                                    self._template_scale(), roi, el.template_scales)
+
+    def find_templates(self, names: List[str], frame: Optional[np.ndarray] = None) -> Dict[str, Optional[TemplateMatch]]:
+        """Match several template elements sharing one search area in a single pass.
+
+        The search area is the union of their search_rois; matches are window-relative.
+        """
+        els = [get_element(n) for n in names]
+        els = [el for el in els if el and el.template_path]
+        if not els:
+            return {n: None for n in names}
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        if all(el.search_roi for el in els):
+            rects = [self._base_rect_to_window(el.search_roi) for el in els]
+            roi = (min(r[0] for r in rects), min(r[1] for r in rects),
+                   max(r[2] for r in rects), max(r[3] for r in rects))
+        else:
+            roi = None
+        requests = [(el.name, el.template_path, el.template_threshold, el.template_scales) for el in els]
+        found = self.templates.match_many(requests, frame, self._template_scale(), roi)
+        return {n: found.get(n) for n in names}
+
+    def element_cue(self, element_or_name: Union[UIElement, str],
+                    confidence: Optional[float] = None, gone: bool = False) -> Optional[Callable[[], bool]]:
+        """Cheap "may be appearing" check for long waits.
+
+        Grabs only the bounding box of the element's points and passes when all
+        points match at a loose confidence, or with gone=True when they no longer
+        all match at the default confidence (e.g. the battle HUD disappearing).
+        An unavailable region also passes, so the wait falls back to normal polling.
+        """
+        el = element_or_name if isinstance(element_or_name, UIElement) else get_element(element_or_name)
+        if not el or not el.pixel_points:
+            return None
+        if confidence is not None:
+            conf = confidence
+        else:
+            conf = Settings.colors.default_confidence if gone else Settings.timeouts.long_wait_cue_confidence
+        xs = [x for (x, _, _) in el.pixel_points]
+        ys = [y for (_, y, _) in el.pixel_points]
+        expected = np.array([rgb_to_native(rgb) for (_, _, rgb) in el.pixel_points], dtype=np.uint8)
+
+        def cue() -> bool:
+            sx, sy = self.get_scaled_coords_array(xs, ys)
+            x1, y1 = int(sx.min()), int(sy.min())
+            w, h = int(sx.max()) - x1 + 1, int(sy.max()) - y1 + 1
+            region = self.grab_region(x1, y1, w, h)
+            if region.shape[:2] != (h, w):
+                return True
+            passed, _ = self._match_native(region, sx - x1, sy - y1, expected, conf)
+            return not passed.all() if gone else bool(passed.all())
+        return cue
+
+    def wait_visible(self, element_or_name: Union[UIElement, str], timeout: Optional[float] = None, use_single_pixel: bool = True,
+                     not_before: Union[float, Future, None] = None, long_wait: bool = False,
+                     cue: Optional[Callable[[], bool]] = None) -> bool:
+        """Wait for an element to be visible.
+
+        long_wait: for multi-minute waits (battles). Only a tiny region is checked,
+        backing off to every Settings.timeouts.long_wait_interval, until the cue
+        fires; per-poll DEBUG logging is suppressed for the whole wait. The cue
+        defaults to the element's colors roughly appearing (element_cue); pass a
+        more telling one when the element alone is not.
+        """
         waiter = Wait(timeout=timeout or Settings.timeouts.default_timeout,
                       name=f"wait_visible:{getattr(element_or_name, 'name', str(element_or_name))}",
-                      abort_check=self.should_abort)
-        return waiter.until(lambda: self.is_visible(element_or_name, use_single_pixel=use_single_pixel))
+                      abort_check=self.should_abort,
+                      frame_source=self,
+                      not_before=not_before,
+                      watch=self._element_watch(element_or_name),
+                      cue=(cue or self.element_cue(element_or_name)) if long_wait else None)
+        predicate = lambda: self.is_visible(element_or_name, use_single_pixel=use_single_pixel)
+        if not long_wait:
+            return waiter.until(predicate)
+        with suppress_debug():
+            ok = waiter.until(predicate)
+        logger.debug(f"Long wait '{waiter.name}' done: ok={ok}, coarse polls={waiter.coarse_polls}, "
+                     f"evaluations={waiter.evaluations}, skipped={waiter.skipped}")
+        return ok
 
     def wait_gone(self, element_or_name: Union[UIElement, str], timeout: Optional[float] = None, use_single_pixel: bool = True) -> bool:
         waiter = Wait(timeout=timeout or Settings.timeouts.default_timeout,
                       name=f"wait_gone:{getattr(element_or_name, 'name', str(element_or_name))}",
-                      abort_check=self.should_abort)
+                      abort_check=self.should_abort,
+                      frame_source=self,
+                      watch=self._element_watch(element_or_name))
         return waiter.until(lambda: not self.is_visible(element_or_name, use_single_pixel=use_single_pixel))
 
+    def _window_to_base(self, x: float, y: float, base_w=1920, base_h=1080) -> Tuple[int, int]:
+        """Inverse of get_scaled_coords (rounded)."""
+        off_x = off_y = 0
+        if self.is_windowed:
+            base_w -= (self.windowed_offset_left + self.windowed_offset_right)
+            base_h -= (self.windowed_offset_top + self.windowed_offset_bottom)
+            off_x, off_y = self.windowed_offset_left, self.windowed_offset_top
+        return int(round(x * base_w / self.width)) - off_x, int(round(y * base_h / self.height)) - off_y
+
+    def find_color(self, rgb, tolerance: int = 10, roi: Optional[Tuple[int, int, int, int]] = None,
+                   min_area: int = 1, frame: Optional[np.ndarray] = None) -> List[ColorBlob]:
+        """Find every region of one or more colors in the current frame.
+
+        rgb: one (r, g, b) or a list of them; tolerance: max difference per channel;
+        roi: base-coords (x, y, w, h) search area (whole window if None). Each
+        color is masked over the area and split into 8-connected blobs; blobs
+        smaller than min_area pixels are dropped. Sorted by area, largest first.
+        """
+        import cv2  # imported lazily like the template matcher
+        colors = [rgb] if len(rgb) == 3 and isinstance(rgb[0], (int, np.integer)) else list(rgb)
+        if frame is None:
+            frame = self.get_native_frame(fresh=False)
+        x1, y1, x2, y2 = self._base_rect_to_window(roi)
+        area = frame[y1:y2, x1:x2]
+        if area.size == 0:
+            return []
+        tol = int(tolerance)
+        blobs: List[ColorBlob] = []
+        for color in colors:
+            b, g, r = rgb_to_native(tuple(color))
+            lower = np.array([max(0, b - tol), max(0, g - tol), max(0, r - tol), 0], dtype=np.uint8)
+            upper = np.array([min(255, b + tol), min(255, g + tol), min(255, r + tol), 255], dtype=np.uint8)
+            mask = cv2.inRange(area, lower, upper)
+            if not cv2.countNonZero(mask):
+                continue
+            # Label only the part of the mask that has matches; labeling dominates otherwise
+            mx, my, mw, mh = cv2.boundingRect(mask)
+            count, _, stats, centroids = cv2.connectedComponentsWithStats(mask[my:my + mh, mx:mx + mw], connectivity=8)
+            ox, oy = x1 + mx, y1 + my
+            for label in range(1, count):
+                bx, by, bw, bh, n = (int(v) for v in stats[label])
+                if n < min_area:
+                    continue
+                cx, cy = float(centroids[label][0]) + ox, float(centroids[label][1]) + oy
+                blobs.append(ColorBlob(tuple(int(c) for c in color), (cx, cy),
+                                       (bx + ox, by + oy, bw, bh), n, self._window_to_base(cx, cy)))
+        blobs.sort(key=lambda blob: blob.area, reverse=True)
+        return blobs
+
+    def _base_rect_to_window(self, region: Optional[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
+        """Base-coords (x, y, w, h) rect -> window-relative (x1, y1, x2, y2); None means the whole window."""
+        if region is None:
+            return 0, 0, self.width, self.height
+        x, y, w, h = region
+        x1, y1 = self.get_scaled_coords(x, y)
+        x2, y2 = self.get_scaled_coords(x + w, y + h)
+        return max(0, x1), max(0, y1), min(self.width, x2), min(self.height, y2)
+
+    def change_detector(self, base_points=None) -> Optional[ChangeDetector]:
+        """ChangeDetector over small windows around base-coords points (None: whole window).
+
+        Rects are rescaled on every check so they follow window resizes.
+        """
+        if base_points is None:
+            return ChangeDetector()
+        pad = Settings.colors.roi_half_size + 2
+        rects = [(int(x) - pad, int(y) - pad, 2 * pad + 1, 2 * pad + 1) for (x, y) in base_points]
+        if not rects:
+            return None
+        return ChangeDetector(lambda: [self._base_rect_to_window(r) for r in rects], step=1)
+
+    def _element_watch(self, element_or_name: Union[UIElement, str]) -> Optional[ChangeDetector]:
+        el = element_or_name if isinstance(element_or_name, UIElement) else get_element(element_or_name)
+        if not el:
+            return None
+        if el.pixel_points:
+            return self.change_detector([(x, y) for (x, y, _) in el.pixel_points])
+        if el.template_path and el.search_roi:
+            return ChangeDetector(lambda: [self._base_rect_to_window(el.search_roi)])
+        return None
+
+    def wait_until_stable(self, region: Tuple[int, int, int, int],
+                          min_stable_ms: Optional[float] = None, timeout: Optional[float] = None,
+                          pixel_tolerance: Optional[int] = None, changed_fraction: Optional[float] = None,
+                          not_before: Union[float, Future, None] = None,
+                          or_until: Optional[Callable[[], bool]] = None) -> bool:
+        """Wait until a base-coords region (x, y, w, h) stops changing.
+
+        Consecutive distinct frames are compared on a 2x-downsampled copy of the
+        region. A pixel has changed when any channel moved by more than
+        pixel_tolerance; the region counts as settled once at most changed_fraction
+        of its pixels change in every comparison for min_stable_ms. Pass the
+        region the next step depends on: a whole-window check dilutes small changes.
+
+        not_before (e.g. the Future returned by click()) makes only frames captured
+        after that moment count, so the wait cannot settle on pre-click frames.
+        or_until ends the wait early (True) once that predicate holds.
+        """
+        t = Settings.timeouts
+        min_stable_ms = t.settle_ms if min_stable_ms is None else min_stable_ms
+        pixel_tolerance = t.settle_pixel_tolerance if pixel_tolerance is None else pixel_tolerance
+        changed_fraction = t.settle_changed_fraction if changed_fraction is None else changed_fraction
+        previous = [None]
+
+        def unchanged() -> bool:
+            # Streamed/pinned frames are already distinct per evaluation; otherwise grab anew
+            frame = self.get_native_frame(fresh=not self.capture_thread_running())
+            x1, y1, x2, y2 = self._base_rect_to_window(region)
+            signature = frame[y1:y2:2, x1:x2:2, :3].astype(np.int16)
+            prev, previous[0] = previous[0], signature
+            if prev is None or prev.shape != signature.shape or signature.size == 0:
+                return False
+            changed = np.abs(signature - prev).max(axis=2) > pixel_tolerance
+            return float(changed.mean()) <= changed_fraction
+
+        waiter = Wait(timeout=timeout or t.default_timeout,
+                      name=f"wait_until_stable:{region}",
+                      require_stable_frames=2,
+                      require_stable_ms=min_stable_ms,
+                      abort_check=self.should_abort,
+                      frame_source=self,
+                      not_before=not_before)
+        if or_until is not None:
+            return waiter.until_any([unchanged, or_until])
+        return waiter.until(unchanged)
+
     def tap(self, element_name: str, required: bool = True) -> bool:
         el = get_element(element_name)
         if not el:
@@ -361,7 +1027,7 @@ class ArknightsWindow:
         if self._dry_run:
             logger.info(f"[DRY-RUN] tap '{element_name}' at {abs_coords}")
             return True
-        pg.click(*abs_coords)
+        self._click_now(*abs_coords)
         self._sleep_ms(Settings.clicks.post_click_grace_ms)
         return True
 
@@ -374,6 +1040,7 @@ class ArknightsWindow:
         - click: base coords (x, y) or element name registered in elements.
         - expect_visible: element name to wait for after click.
         """
+        delivered = None
         if isinstance(click, str):
             ok = self.tap(click, required=False)
             if not ok:
@@ -388,11 +1055,17 @@ class ArknightsWindow:
             if self._dry_run:
                 logger.info(f"[DRY-RUN] safe_click at {abs_coords}")
             else:
-                pg.click(*abs_coords)
-            self._sleep_ms(Settings.clicks.post_click_grace_ms)
+                delivered = self._send_click(*abs_coords)
+            pipelined = bool(expect_visible) and delivered is not None and Settings.clicks.async_dispatch
+            if not pipelined:
+                if delivered is not None:
+                    delivered.result()
+                self._sleep_ms(Settings.clicks.post_click_grace_ms)
+                delivered = None
 
         if expect_visible:
-            return self.wait_visible(expect_visible, timeout=timeout)
+            # A pending delivery replaces the grace sleep: only frames after the click count
+            return self.wait_visible(expect_visible, timeout=timeout, not_before=delivered)
         return True
 
     def click_and_wait(self, click_coords, wait_coords, expected_color, mode='appear', timeout=10, check_delay=0.01, confidence=0.9, use_single_pixel: bool = True):
@@ -412,11 +1085,14 @@ class ArknightsWindow:
         jx, jy = self._jitter_coords(click_coords[0], click_coords[1])
         absolute_coords = self.get_absolute_coords(jx, jy)
         logger.debug(f"Clicking at {absolute_coords} and waiting for {expected_color} to {mode} at {wait_coords}")
+        delivered = None
         if self._dry_run:
             logger.info(f"[DRY-RUN] click at {absolute_coords}")
         else:
-            pg.click(*absolute_coords)
-        self._sleep_ms(Settings.clicks.post_click_grace_ms)
+            delivered = self._send_click(*absolute_coords)
+        if delivered is None or not Settings.clicks.async_dispatch:
+            self._sleep_ms(Settings.clicks.post_click_grace_ms)
+            delivered = None
 
         # Wait for response (resilient)
         def predicate():
@@ -426,7 +1102,9 @@ class ArknightsWindow:
                 ok = self.check_color_at_robust(*wait_coords, expected_color, confidence=max(confidence, Settings.colors.default_confidence))
             return ok if mode == 'appear' else (not ok)
 
-        waiter = Wait(timeout=timeout, name=f"click_and_wait:{mode}", abort_check=self.should_abort)
+        # Verification starts at delivery, on frames captured after the click
+        waiter = Wait(timeout=timeout, name=f"click_and_wait:{mode}", abort_check=self.should_abort,
+                      frame_source=self, not_before=delivered, watch=self.change_detector([wait_coords]))
         ok = waiter.until(predicate)
         if not ok and Settings.observability.enable_failure_screenshots:
             try:
@@ -447,7 +1125,8 @@ class ArknightsWindow:
                 ok = self.check_color_at_robust(*coords, expected_color, confidence=max(confidence, Settings.colors.default_confidence))
             return ok if mode == 'appear' else (not ok)
 
-        waiter = Wait(timeout=timeout, name=f"wait_for_color_change:{mode}", abort_check=self.should_abort)
+        waiter = Wait(timeout=timeout, name=f"wait_for_color_change:{mode}", abort_check=self.should_abort,
+                      frame_source=self, watch=self.change_detector([coords]))
         ok = waiter.until(predicate)
         if not ok and Settings.observability.enable_failure_screenshots:
             try:
@@ -490,7 +1169,7 @@ class ArknightsWindow:
             if self._dry_run:
                 logger.info(f"[DRY-RUN] spam-click at {absolute_coords}")
             else:
-                pg.click(*absolute_coords)
+                self._click_now(*absolute_coords)
             self._sleep_ms(int(click_delay * 1000))
 
             if condition_met():
@@ -513,11 +1192,14 @@ class ArknightsWindow:
     def wait_state(self, state_name: str, timeout: Optional[float] = None) -> bool:
         return _states.wait_state(self, state_name, timeout=timeout)
 
+    def navigate(self, state_name: str, max_taps: int = 12) -> bool:
+        return _states.navigate(self, state_name, max_taps=max_taps)
+
     # --- Observability ---
     def save_failure_artifact(self, label: str, roi_rects: Optional[List[Tuple[int, int, int, int]]] = None) -> Optional[str]:
         try:
-            frame = self.get_frame(fresh=True)  # RGB numpy array
-            img = Image.fromarray(frame)
+            frame = self.get_frame(fresh=True)  # RGB view of the native frame
+            img = Image.fromarray(np.ascontiguousarray(frame))
             if roi_rects:
                 draw = ImageDraw.Draw(img)
                 # Convert configured BGR to RGB for PIL if needed
@@ -537,6 +1219,7 @@ class ArknightsWindow:
             return None
 
 ark_window = ArknightsWindow('BlueStacks App Player')
+atexit.register(ark_window.close)
 if __name__ == "__main__":
     # print([w.title for w in gw.getAllWindows() if 'bluestacks' in w.title.lower()])
     # coords = ark_window.get_scaled_coords(486, 435)
@@ -1,16 +1,81 @@
 import time
 import random
-from typing import Callable, Iterable, Optional
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Iterable, Iterator, List, Optional, Union
 from logger import logger
 from config import Settings
 
 
+class _Stability:
+    """A run of successful checks, counted once per distinct frame.
+
+    Frames are anything with frame_id/timestamp (frames.Frame); with no frame
+    identity available each poll counts, as before.
+    """
+
+    def __init__(self, frames: int, ms: float):
+        self.frames = max(1, int(frames))
+        self.ms = max(0.0, float(ms or 0.0))
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.last_id: Optional[int] = None
+
+    @property
+    def pending(self) -> bool:
+        return self.count > 0
+
+    def satisfied(self) -> bool:
+        if self.count < self.frames:
+            return False
+        return self.ms <= 0 or (self.last_ts - self.first_ts) * 1000.0 >= self.ms
+
+    def confirm(self, frame) -> bool:
+        if frame is not None:
+            if frame.frame_id == self.last_id:
+                # Same image as the last confirmation: not new evidence
+                return self.satisfied()
+            self.last_id, ts = frame.frame_id, frame.timestamp
+        else:
+            ts = time.monotonic()
+        self.count += 1
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+        return self.satisfied()
+
+
 class Wait:
     """Flexible waiter with backoff and stability frames.
 
     - until(predicate): retries until predicate returns True for N consecutive frames
     - until_any(*predicates): succeeds if any becomes stably True
     - until_all(*predicates): succeeds when all are stably True
+
+    Stability counts distinct frames (by frame id) when a frame_source is given,
+    and can additionally require the run to span require_stable_ms.
+
+    If a frame_source (ArknightsWindow) is given and its background capture is
+    running, predicates are evaluated exactly once per newly published frame
+    instead of after a random sleep; the frame is pinned while they run.
+
+    not_before (a time.monotonic() timestamp, or a Future resolving to one, such as
+    a dispatched click's delivery time) restricts evaluation to frames captured
+    after that moment; polling starts as soon as it is known.
+
+    With a `watch` (frames.ChangeDetector over the regions the predicates read),
+    a poll whose watched regions are unchanged since the last evaluation reuses
+    the previous results instead of re-running the predicates.
+
+    Long waits can pass a `cue`: a cheap check that the awaited screen may be near
+    (e.g. a loose color match on a tiny region). While it is False the predicates
+    are not evaluated and the waiter only re-checks the cue, starting at the
+    normal poll interval and doubling it up to coarse_interval seconds; once it is
+    True, polling runs at the normal rate. Switches between the two are logged,
+    individual polls are not.
     """
 
     def __init__(self,
@@ -18,49 +83,193 @@ class Wait:
                  min_interval: Optional[float] = None,
                  max_interval: Optional[float] = None,
                  require_stable_frames: Optional[int] = None,
+                 require_stable_ms: Optional[float] = None,
                  abort_check: Optional[Callable[[], bool]] = None,
-                 name: str = ""):
+                 name: str = "",
+                 frame_source=None,
+                 not_before: Union[float, Future, None] = None,
+                 watch=None,
+                 cue: Optional[Callable[[], bool]] = None,
+                 coarse_interval: Optional[float] = None):
         t = Settings.timeouts
         self.timeout = timeout if timeout is not None else t.default_timeout
         self.min_interval = min_interval if min_interval is not None else t.check_interval_min
         self.max_interval = max_interval if max_interval is not None else t.check_interval_max
         self.require_stable_frames = require_stable_frames if require_stable_frames is not None else t.stability_frames
+        self.require_stable_ms = require_stable_ms if require_stable_ms is not None else t.stability_ms
         self.abort_check = abort_check
         self.name = name
+        self.frame_source = frame_source
+        self.not_before = not_before
+        self.watch = watch if Settings.timeouts.skip_unchanged_frames else None
+        self._last_results: Optional[List[object]] = None
+        # Polls that ran the predicates vs. reused results on an unchanged screen
+        self.evaluations = 0
+        self.skipped = 0
+        self.cue = cue
+        self.coarse_interval = coarse_interval if coarse_interval is not None else t.long_wait_interval
+        self._cue_seen: Optional[bool] = None
+        self._coarse_sleep = self.max_interval
+        self.coarse_polls = 0
+        self._seen_frame_id = 0
+        self._aborted = False
+        self._stability_pending = False
+
+    def _new_stability(self) -> _Stability:
+        return _Stability(self.require_stable_frames, self.require_stable_ms)
 
     def _sleep(self):
-        dt = random.uniform(self.min_interval, self.max_interval)
+        # While a stability run is pending, poll again as soon as a new frame can exist
+        dt = self.min_interval if self._stability_pending else random.uniform(self.min_interval, self.max_interval)
         time.sleep(dt)
 
+    def _observed_frame(self, pinned):
+        """Frame the last evaluation looked at: the pinned one, else the newest published."""
+        if pinned is not None:
+            return pinned
+        if self.frame_source is None:
+            return None
+        try:
+            return self.frame_source.latest_frame()
+        except Exception:
+            return None
+
     def _should_abort(self) -> bool:
         try:
             return bool(self.abort_check and self.abort_check())
         except Exception:
             return False
 
-    def until(self, predicate: Callable[[], bool]) -> bool:
-        start = time.monotonic()
-        stable = 0
-        last_exception: Optional[Exception] = None
+    def _frame_driven(self) -> bool:
+        src = self.frame_source
+        return bool(src is not None and Settings.timeouts.wait_on_frames and src.capture_thread_running())
 
-        while (time.monotonic() - start) < self.timeout:
+    def _resolve_not_before(self, deadline: float) -> Union[float, bool, None]:
+        """Timestamp frames must be newer than; False while a Future is still pending."""
+        nb = self.not_before
+        if not isinstance(nb, Future):
+            return nb
+        try:
+            return nb.result(timeout=max(0.0, min(deadline - time.monotonic(), 0.1)))
+        except FutureTimeout:
+            return False
+
+    def _ensure_frame_after(self, ts: float):
+        """Polling mode: make sure the frame predicates read was captured after ts."""
+        try:
+            latest = self.frame_source.latest_frame()
+            if latest is None or latest.timestamp <= ts:
+                self.frame_source.get_native_frame(fresh=True)
+        except Exception:
+            pass
+
+    def _cue_active(self, label: str) -> bool:
+        try:
+            seen = bool(self.cue())
+        except Exception:
+            seen = True  # can't tell; poll normally
+        if seen:
+            self._coarse_sleep = self.max_interval
+        if seen != self._cue_seen:
+            if seen:
+                logger.info(f"{label} '{self.name}': cue seen, polling at full rate")
+            elif self._cue_seen is None:
+                logger.info(f"{label} '{self.name}': no cue yet, polling at most every {self.coarse_interval:.2f}s")
+            else:
+                logger.info(f"{label} '{self.name}': cue lost, back to polling at most every {self.coarse_interval:.2f}s")
+            self._cue_seen = seen
+        return seen
+
+    def _polls(self, label: str) -> Iterator[Optional[object]]:
+        """Yield once per predicate evaluation until timeout or abort.
+
+        Yields the pinned frame when frame-driven, else None.
+
+        Frame-driven: block on the next distinct frame (in short slices so abort and
+        timeout stay responsive) and pin it for the evaluation. Otherwise: evaluate,
+        then sleep a random interval.
+        """
+        self._aborted = False
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
             if self._should_abort():
-                logger.warning(f"Wait '{self.name}' aborted by panic/safety signal")
-                return False
+                logger.warning(f"{label} '{self.name}' aborted by panic/safety signal")
+                self._aborted = True
+                return
             try:
-                ok = bool(predicate())
-                if ok:
-                    stable += 1
-                    if stable >= self.require_stable_frames:
-                        return True
-                else:
-                    stable = 0
+                not_before = self._resolve_not_before(deadline)
+            except Exception as ex:
+                logger.warning(f"{label} '{self.name}' cancelled: awaited click failed ({ex})")
+                self._aborted = True
+                return
+            if not_before is False:
+                continue
+            if self.cue is not None and not self._cue_active(label):
+                self.coarse_polls += 1
+                time.sleep(max(0.0, min(self._coarse_sleep, deadline - time.monotonic())))
+                self._coarse_sleep = min(self._coarse_sleep * 2, self.coarse_interval)
+                continue
+            if self._frame_driven():
+                remaining = deadline - time.monotonic()
+                frame = self.frame_source.wait_for_new_frame(self._seen_frame_id, timeout=max(0.0, min(remaining, 0.1)))
+                if frame is None:
+                    continue
+                self._seen_frame_id = frame.frame_id
+                if not_before is not None and frame.timestamp <= not_before:
+                    continue
+                with self.frame_source.pin_frame(frame):
+                    yield frame
+            else:
+                if not_before is not None and self.frame_source is not None:
+                    self._ensure_frame_after(not_before)
+                yield None
+                self._sleep()
+
+    def _watched_unchanged(self, pinned) -> bool:
+        src = self.frame_source
+        try:
+            image = pinned.image if pinned is not None else src.get_native_frame()
+        except Exception:
+            return False
+        return not self.watch.changed(image)
+
+    def _evaluate(self, predicates: List[Callable[[], bool]], pinned) -> List[object]:
+        """Run the predicates: a bool each, or the exception it raised.
+
+        Results are reused when the watched regions haven't changed since the last
+        evaluation (exceptions are never reused).
+        """
+        if self.watch is not None and self.frame_source is not None:
+            if self._watched_unchanged(pinned) and self._last_results is not None:
+                self.skipped += 1
+                return self._last_results
+        results: List[object] = []
+        for p in predicates:
+            try:
+                results.append(bool(p()))
             except Exception as ex:
-                last_exception = ex
-                stable = 0
+                results.append(ex)
+        self.evaluations += 1
+        self._last_results = results if all(isinstance(r, bool) for r in results) else None
+        return results
 
-            self._sleep()
+    def until(self, predicate: Callable[[], bool]) -> bool:
+        stability = self._new_stability()
+        last_exception: Optional[Exception] = None
 
+        for pinned in self._polls("Wait"):
+            ok = self._evaluate([predicate], pinned)[0]
+            if ok is True:
+                if stability.confirm(self._observed_frame(pinned)):
+                    return True
+            else:
+                if isinstance(ok, Exception):
+                    last_exception = ok
+                stability.reset()
+            self._stability_pending = stability.pending
+
+        if self._aborted:
+            return False
         if last_exception:
             logger.warning(f"Wait '{self.name}' timed out with last exception: {last_exception}")
         else:
@@ -68,67 +277,43 @@ class Wait:
         return False
 
     def until_any(self, predicates: Iterable[Callable[[], bool]]) -> bool:
-        start = time.monotonic()
         preds = list(predicates)
-        stables = [0] * len(preds)
+        stables = [self._new_stability() for _ in preds]
 
-        while (time.monotonic() - start) < self.timeout:
-            if self._should_abort():
-                logger.warning(f"Wait-any '{self.name}' aborted by panic/safety signal")
-                return False
-
-            any_true = False
-            for i, p in enumerate(preds):
-                try:
-                    ok = bool(p())
-                    if ok:
-                        stables[i] += 1
-                        if stables[i] >= self.require_stable_frames:
-                            return True
-                        any_true = True
-                    else:
-                        stables[i] = 0
-                except Exception:
-                    stables[i] = 0
-
-            if any_true:
-                # If something flickered true, still require stability, but we can sleep shorter
-                pass
-
-            self._sleep()
-
-        logger.warning(f"Wait-any '{self.name}' timed out after {self.timeout:.2f}s")
+        for pinned in self._polls("Wait-any"):
+            frame = None
+            for i, ok in enumerate(self._evaluate(preds, pinned)):
+                if ok is True:
+                    frame = frame or self._observed_frame(pinned)
+                    if stables[i].confirm(frame):
+                        return True
+                else:
+                    stables[i].reset()
+            self._stability_pending = any(st.pending for st in stables)
+
+        if not self._aborted:
+            logger.warning(f"Wait-any '{self.name}' timed out after {self.timeout:.2f}s")
         return False
 
     def until_all(self, predicates: Iterable[Callable[[], bool]]) -> bool:
-        start = time.monotonic()
         preds = list(predicates)
-        stables = [0] * len(preds)
-
-        while (time.monotonic() - start) < self.timeout:
-            if self._should_abort():
-                logger.warning(f"Wait-all '{self.name}' aborted by panic/safety signal")
-                return False
+        stables = [self._new_stability() for _ in preds]
 
+        for pinned in self._polls("Wait-all"):
             all_true = True
-            for i, p in enumerate(preds):
-                try:
-                    ok = bool(p())
-                    if ok:
-                        stables[i] += 1
-                    else:
-                        stables[i] = 0
-                        all_true = False
-                except Exception:
-                    stables[i] = 0
+            frame = None
+            for i, ok in enumerate(self._evaluate(preds, pinned)):
+                if ok is True:
+                    frame = frame or self._observed_frame(pinned)
+                    stables[i].confirm(frame)
+                else:
+                    stables[i].reset()
                     all_true = False
 
-            if all_true and all(s >= self.require_stable_frames for s in stables):
+            if all_true and all(st.satisfied() for st in stables):
                 return True
+            self._stability_pending = any(st.pending for st in stables)
 
-            self._sleep()
-
-        logger.warning(f"Wait-all '{self.name}' timed out after {self.timeout:.2f}s")
+        if not self._aborted:
+            logger.warning(f"Wait-all '{self.name}' timed out after {self.timeout:.2f}s")
         return False
-
-